@@ -0,0 +1,31 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.core.config import settings
+from app.core.slow_queries import slow_query_log
+
+
+def require_admin_token(authorization: Optional[str] = Header(None)) -> None:
+    """Check the ``Authorization: Bearer`` header against ADMIN_TOKEN"""
+    if not settings.ADMIN_TOKEN or not hmac.compare_digest(
+            authorization or "", f"Bearer {settings.ADMIN_TOKEN}"
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+admin_router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+
+@admin_router.get("/slow-queries")
+async def get_slow_queries():
+    """Recent statements over the slow query threshold, newest first, with their plans"""
+    return {
+        "threshold": slow_query_log.threshold,
+        "queries": [entry.as_dict() for entry in slow_query_log.recent()],
+    }
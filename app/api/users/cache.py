@@ -0,0 +1,43 @@
+import logging
+from typing import Optional
+
+from app.core.cache import ReadThroughCache, SharedCacheTier
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.schemas.user import UserResponseSchema
+
+logger = logging.getLogger(__name__)
+
+
+def _create_shared_tier() -> Optional[SharedCacheTier]:
+    """Use Redis as the shared tier when REDIS_URL is set and redis is installed"""
+    if not settings.REDIS_URL:
+        return None
+    try:
+        from redis import asyncio as aioredis
+    except ImportError:
+        logger.warning("REDIS_URL is set but the redis package is not installed")
+        return None
+    return SharedCacheTier(aioredis.from_url(settings.REDIS_URL), prefix="users:")
+
+
+# Cached user responses by id; rows rarely change and writes invalidate them
+user_cache: ReadThroughCache[UserResponseSchema] = ReadThroughCache(
+    "users",
+    serialize=lambda user: user.model_dump_json().encode(),
+    deserialize=UserResponseSchema.model_validate_json,
+    ttl=settings.USER_CACHE_TTL,
+    negative_ttl=settings.USER_CACHE_NEGATIVE_TTL,
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    # Writes in other workers or instances only show up once local entries expire
+    local_ttl=settings.USER_CACHE_LOCAL_TTL if settings.WORKERS_COUNT > 1 or settings.REDIS_URL else None,
+    shared=_create_shared_tier(),
+)
+
+
+# In-flight user reads by selector call and arguments
+user_reads: SingleFlight = SingleFlight(
+    "users",
+    window=settings.USER_READ_COALESCING_WINDOW,
+    max_results=settings.USER_READ_COALESCING_MAX_RESULTS,
+)
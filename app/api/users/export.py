@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy.engine import Row
+
+# Exported columns, the same fields as UserResponseSchema
+EXPORT_COLUMNS = (
+    "id",
+    "email",
+    "username",
+    "full_name",
+    "bio",
+    "is_active",
+    "created_at",
+    "updated_at",
+)
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+async def encode_ndjson(batches: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    """Encode row batches as newline-delimited JSON, one chunk per batch"""
+    async for rows in batches:
+        yield "".join(
+            json.dumps({column: _json_value(value) for column, value in zip(EXPORT_COLUMNS, row)}) + "\n"
+            for row in rows
+        ).encode()
+
+
+async def encode_csv(batches: AsyncIterator[Sequence[Row]]) -> AsyncIterator[bytes]:
+    """Encode row batches as CSV with a header row, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue().encode()
+
+    async for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", encode_ndjson),
+    "csv": ("text/csv", encode_csv),
+}
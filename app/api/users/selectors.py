@@ -1,12 +1,48 @@
-from uuid import UUID
-from typing import Optional, List
+from uuid import UUID, uuid4
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Optional, List, Sequence, Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import select
+from sqlalchemy import select, tuple_
+from sqlalchemy.engine import Row
+from sqlalchemy.dialects.postgresql import insert
 
+from app.api.users.cache import user_cache, user_reads
+from app.api.users.export import EXPORT_COLUMNS
+from app.core.config import settings
+from app.core.security import password_hasher
+from app.metrics.request_timing import span
 from app.models.user import UserModel
-from app.schemas.user import NewUserSchema
+from app.schemas.user import NewUserSchema, UserResponseSchema
+
+
+# Columns of a UserResponseSchema, for reads that skip the ORM
+USER_RESPONSE_COLUMNS = tuple(getattr(UserModel, field) for field in UserResponseSchema.model_fields)
+
+# Columns that identify a version of a user row, for conditional requests
+VERSION_COLUMNS = (UserModel.id, UserModel.created_at, UserModel.updated_at)
+
+
+def _page_query(columns, page: int, limit: int, after: Optional[Tuple[datetime, UUID]]):
+    """Select ``columns`` for a page ordered by (created_at, id), by keyset when ``after`` is given"""
+    query = select(*columns)
+    if after is not None:
+        query = query.where(tuple_(UserModel.created_at, UserModel.id) > tuple_(*after))
+    else:
+        query = query.offset(page * limit)
+    return query.order_by(UserModel.created_at, UserModel.id).limit(limit)
+
+
+async def _coalesced(key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+    """Run ``load`` once for concurrent identical reads.
+
+    Waiters get the result of the leader's query, which ran on the leader's
+    session; results must not be ORM instances bound to it.
+    """
+    if not settings.USER_READ_COALESCING_ENABLED:
+        return await load()
+    return await user_reads.do(key, load)
 
 
 class UserSelector:
@@ -15,6 +51,27 @@ class UserSelector:
         result = await db.execute(select(UserModel).where(UserModel.id == user_id))
         return result.scalar_one_or_none()
 
+    @staticmethod
+    async def get_response_by_id(db: AsyncSession, user_id: UUID) -> Optional[UserResponseSchema]:
+        """Read-through cached user response, ``None`` if the user doesn't exist"""
+        async def fetch() -> Optional[UserResponseSchema]:
+            user = await UserSelector.get_by_id(db, user_id)
+            return UserResponseSchema.model_validate(user) if user else None
+
+        async def load() -> Optional[UserResponseSchema]:
+            return await _coalesced(("get_response_by_id", user_id), fetch)
+
+        with span("get_response_by_id"):
+            if not settings.USER_CACHE_ENABLED:
+                return await load()
+            return await user_cache.get_or_load(str(user_id), load)
+
+    @staticmethod
+    async def invalidate(user_id: UUID) -> None:
+        """Drop a user from the read caches, call after every write to the row"""
+        user_reads.forget(("get_response_by_id", user_id))
+        await user_cache.invalidate(str(user_id))
+
     @staticmethod
     async def get_users(db: AsyncSession, page: int = 0, limit: int = 100) -> List[UserModel]:
         skip = page * limit
@@ -22,25 +79,118 @@ class UserSelector:
             select(UserModel)
             .offset(skip)
             .limit(limit)
-            .order_by(UserModel.created_at)
+            .order_by(UserModel.created_at, UserModel.id)
         )
         return result.scalars().all()
 
+    @staticmethod
+    async def get_user_rows(
+            db: AsyncSession,
+            page: int = 0,
+            limit: int = 100,
+            after: Optional[Tuple[datetime, UUID]] = None
+    ) -> List[dict]:
+        """Page of response columns as plain dicts, by keyset when ``after`` is given"""
+        async def fetch() -> List[dict]:
+            result = await db.execute(_page_query(USER_RESPONSE_COLUMNS, page, limit, after))
+            return [row._asdict() for row in result]
+
+        with span("get_user_rows"):
+            return await _coalesced(("get_user_rows", page if after is None else None, limit, after), fetch)
+
+    @staticmethod
+    async def get_row_versions(
+            db: AsyncSession,
+            page: int = 0,
+            limit: int = 100,
+            after: Optional[Tuple[datetime, UUID]] = None
+    ) -> Sequence[Row]:
+        """(id, created_at, updated_at) of the rows ``get_user_rows`` would return"""
+        async def fetch() -> Sequence[Row]:
+            result = await db.execute(_page_query(VERSION_COLUMNS, page, limit, after))
+            return result.all()
+
+        with span("get_row_versions"):
+            return await _coalesced(("get_row_versions", page if after is None else None, limit, after), fetch)
+
+    @staticmethod
+    async def stream_users(db: AsyncSession, batch_size: int = 1000) -> AsyncIterator[Sequence[Row]]:
+        """Yield batches of export rows from a server-side cursor"""
+        result = await db.stream(
+            select(*(getattr(UserModel, column) for column in EXPORT_COLUMNS))
+            .order_by(UserModel.created_at, UserModel.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for rows in result.partitions(batch_size):
+            yield rows
+
     @staticmethod
     async def create(db: AsyncSession, new_user: NewUserSchema) -> UserModel:
+        hashed_password = await password_hasher.hash(new_user.password)
         try:
             user = UserModel(
                 email=new_user.email,
                 username=new_user.username,
                 full_name=new_user.full_name,
                 bio=new_user.bio,
-                hashed_password=new_user.password,
+                hashed_password=hashed_password,
                 is_active=new_user.is_active,
             )
             db.add(user)
             await db.commit()
             await db.refresh(user)
+            # Clear a cached "not found" for this id, and list pages that miss the user
+            await UserSelector.invalidate(user.id)
+            user_reads.clear()
             return user
         except IntegrityError:
             await db.rollback()
             raise ValueError("Email or username already exists")
+
+    @staticmethod
+    async def create_many(
+            db: AsyncSession,
+            new_users: List[NewUserSchema],
+            chunk_size: int = 1000
+    ) -> List[Optional[UUID]]:
+        """Insert users with multi-row INSERTs in one transaction.
+
+        Returns the new id for every inserted row and ``None`` for rows skipped
+        because their email or username already exists, in input order.
+        """
+        ids = [uuid4() for _ in new_users]
+        hashed_passwords = await password_hasher.hash_many([new_user.password for new_user in new_users])
+        rows = [
+            {
+                "id": user_id,
+                "email": new_user.email,
+                "username": new_user.username,
+                "full_name": new_user.full_name,
+                "bio": new_user.bio,
+                "hashed_password": hashed_password,
+                "is_active": new_user.is_active,
+                "is_superuser": False,
+            }
+            for user_id, new_user, hashed_password in zip(ids, new_users, hashed_passwords)
+        ]
+
+        inserted = set()
+        try:
+            # Chunked to stay below the driver's bind parameter limit
+            for start in range(0, len(rows), chunk_size):
+                result = await db.execute(
+                    insert(UserModel)
+                    .values(rows[start:start + chunk_size])
+                    .on_conflict_do_nothing()
+                    .returning(UserModel.id)
+                )
+                inserted.update(result.scalars().all())
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        # Ids are new, so there are no cached "not found" entries to clear
+        if inserted:
+            user_reads.clear()
+        return [user_id if user_id in inserted else None for user_id in ids]
@@ -1,44 +1,141 @@
 from uuid import UUID
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi import status, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-from app.schemas.user import UserResponseSchema, NewUserSchema
+from app.schemas.user import (
+    user_rows_adapter,
+    UserResponseSchema,
+    NewUserSchema,
+    BulkUserCreateSchema,
+    BulkUserResponseSchema,
+    BulkUserResultSchema,
+)
 from app.models.user import UserModel
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, AsyncSessionLocal
+from app.core.security import PasswordHasherOverloaded
+from app.metrics.request_timing import span
 from app.api.users.selectors import UserSelector
+from app.api.pagination import encode_cursor, decode_cursor, InvalidCursorError
+from app.api.conditional import make_etag, is_not_modified, validator_headers, not_modified
+from app.api.users.export import EXPORT_FORMATS
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[UserResponseSchema])
 async def get_users(
+        request: Request,
         page: int = Query(0, ge=0, description="Number of users to skip"),
         limit: int = Query(100, ge=1, le=1000, description="Number of users to return"),
+        cursor: Optional[str] = Query(None, description="Cursor from X-Next-Cursor, replaces page"),
         db: AsyncSession = Depends(get_db)
 ):
-    """Get list of users with pagination"""
-    users = await UserSelector.get_users(db, page=page, limit=limit)
-    return users
+    """Get list of users with pagination
+
+    The ``X-Next-Cursor`` response header points after the last returned user;
+    passing it back as ``cursor`` fetches the next page without an OFFSET scan.
+    Rows are read without the ORM and serialized straight to JSON bytes.
+
+    Conditional requests are checked against the ids and ``updated_at`` of the
+    page before any full row is loaded, answering 304 when nothing changed.
+    """
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+
+    if "if-none-match" in request.headers or "if-modified-since" in request.headers:
+        versions = await UserSelector.get_row_versions(db, page=page, limit=limit, after=after)
+        headers = _page_headers(versions, limit)
+        if is_not_modified(request, headers["ETag"], _last_modified(versions)):
+            return not_modified(headers)
+
+    users = await UserSelector.get_user_rows(db, page=page, limit=limit, after=after)
+    with span("render"):
+        body = user_rows_adapter.dump_json(users)
+    # Validators come from the rows actually sent, which may be newer than the check
+    versions = [(user["id"], user["created_at"], user["updated_at"]) for user in users]
+    return Response(body, media_type="application/json", headers=_page_headers(versions, limit))
+
+
+def _last_modified(versions) -> Optional[datetime]:
+    return max((updated_at or created_at for _, created_at, updated_at in versions), default=None)
+
+
+def _page_headers(versions, limit: int) -> Dict[str, str]:
+    """Validators, Cache-Control and X-Next-Cursor for a page of (id, created_at, updated_at)"""
+    headers = validator_headers(
+        make_etag((row_id, updated_at or created_at) for row_id, created_at, updated_at in versions),
+        _last_modified(versions),
+        settings.USER_CACHE_CONTROL
+    )
+    if len(versions) == limit:
+        row_id, created_at, _ = versions[-1]
+        headers["X-Next-Cursor"] = encode_cursor(created_at, row_id)
+    return headers
+
+
+@router.get("/export")
+async def export_users(
+        format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv")
+):
+    """Stream every user as NDJSON or CSV in constant memory"""
+    media_type, encode = EXPORT_FORMATS[format]
+
+    async def batches():
+        # The response outlives request dependencies, so the stream owns its session
+        async with AsyncSessionLocal() as db:
+            async for rows in UserSelector.stream_users(db, batch_size=settings.USER_EXPORT_BATCH_SIZE):
+                yield rows
+
+    return StreamingResponse(
+        encode(batches()),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'}
+    )
 
 
 @router.get("/{user_id}", response_model=UserResponseSchema)
 async def get_user(
+        request: Request,
         user_id: UUID,
         db: AsyncSession = Depends(get_db)
 ):
-    """Get user by ID"""
-    user = await UserSelector.get_by_id(db, user_id)
+    """Get user by ID
+
+    Served from the read cache, so validators are computed from the cached
+    response itself; a version query would cost more than the cache hit.
+    """
+    user = await UserSelector.get_response_by_id(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return user
+
+    last_modified = user.updated_at or user.created_at
+    headers = validator_headers(
+        make_etag([(user.id, last_modified)]),
+        last_modified,
+        settings.USER_CACHE_CONTROL
+    )
+    if is_not_modified(request, headers["ETag"], last_modified):
+        return not_modified(headers)
+    with span("render"):
+        body = user.model_dump_json()
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @router.post("/", response_model=UserResponseSchema, status_code=status.HTTP_201_CREATED)
@@ -51,8 +148,45 @@ async def create_user(
         user = await UserSelector.create(db=db, new_user=new_user)
 
         return user
+    except PasswordHasherOverloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+
+
+@router.post("/bulk", response_model=BulkUserResponseSchema)
+async def create_users_bulk(
+        batch: BulkUserCreateSchema,
+        db: AsyncSession = Depends(get_db)
+):
+    """Create many users in one transaction, reporting conflicts per row
+
+    The inserts are batched, but every row still needs its own bcrypt hash,
+    so hashing bounds the throughput and a request is capped at
+    ``USER_BULK_MAX_ROWS`` rows to keep it within a normal request timeout.
+    """
+    try:
+        ids = await UserSelector.create_many(db=db, new_users=batch.users)
+    except PasswordHasherOverloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+    results = [
+        BulkUserResultSchema(index=index, status="created" if user_id else "conflict", id=user_id)
+        for index, user_id in enumerate(ids)
+    ]
+    created = sum(1 for user_id in ids if user_id)
+    return BulkUserResponseSchema(
+        created=created,
+        conflicts=len(ids) - created,
+        results=results
+    )
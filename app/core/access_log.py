@@ -0,0 +1,178 @@
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, TextIO
+
+from starlette.types import Scope
+
+from app.core.config import settings
+from app.metrics.access_log_metrics import access_log_dropped_total, access_log_records_total
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Bound once, these are hit on every request
+_records_logged = access_log_records_total.labels(outcome='logged')
+_records_sampled_out = access_log_records_total.labels(outcome='sampled_out')
+
+
+class AccessLogSampler:
+    """Decides which requests are logged.
+
+    Server errors and requests slower than ``slow_threshold`` are always
+    logged; everything else is logged with probability ``success_rate``.
+    """
+
+    def __init__(self, success_rate: float = 1.0, slow_threshold: float = 1.0, error_status: int = 500):
+        self.success_rate = success_rate
+        self.slow_threshold = slow_threshold
+        self.error_status = error_status
+
+    def should_log(self, status_code: int, duration: float) -> bool:
+        if status_code >= self.error_status or duration >= self.slow_threshold:
+            return True
+        return self.success_rate >= 1.0 or random.random() < self.success_rate
+
+
+class AccessLogFormatter(logging.Formatter):
+    """Formats access records as one JSON object or the classic text line"""
+
+    def __init__(self, json_output: bool = True):
+        super().__init__(TEXT_FORMAT)
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = record.access
+        if self.json_output:
+            return json.dumps(
+                {"timestamp": self.formatTime(record), "logger": record.name, **fields},
+                separators=(",", ":")
+            )
+        record.msg = (
+            f"{fields['method']} {fields['path']} - "
+            f"Status: {fields['status']} - "
+            f"Time: {fields['duration']:.4f}s"
+        )
+        if fields['request_id'] is not None:
+            record.msg += f" - Request-ID: {fields['request_id']}"
+        return super().format(record)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Queue handler that never blocks or formats on the caller's thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens in the writer thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            access_log_dropped_total.labels(reason='queue_full').inc()
+
+
+class _AccessLogListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Waits for the writer to make room; a full queue must not lose the stop signal
+        self.queue.put(self._sentinel)
+
+
+class _CountingStreamHandler(logging.StreamHandler):
+    def handleError(self, record: logging.LogRecord) -> None:
+        access_log_dropped_total.labels(reason='write_error').inc()
+        super().handleError(record)
+
+
+class AccessLogger:
+    """Structured access log written by a background thread.
+
+    Records are built on the event loop and put on a bounded queue; a
+    ``QueueListener`` thread formats and writes them, so the loop never waits
+    on stdout. When the queue is full records are dropped and counted.
+    Nothing is logged before ``start``.
+    """
+
+    def __init__(
+            self,
+            sampler: AccessLogSampler,
+            json_output: bool = True,
+            queue_size: int = 10000,
+            name: str = "app.access"
+    ):
+        self.sampler = sampler
+        self.json_output = json_output
+        self.queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+        self.logger = logging.getLogger(name)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self._handler = _DroppingQueueHandler(self.queue)
+        self._listener: Optional[_AccessLogListener] = None
+
+    def start(self, stream: Optional[TextIO] = None) -> None:
+        """Start the writer thread, writing to ``stream`` (stdout by default)"""
+        if self._listener is not None:
+            return
+        handler = _CountingStreamHandler(stream or sys.stdout)
+        handler.setFormatter(AccessLogFormatter(self.json_output))
+        self._listener = _AccessLogListener(self.queue, handler)
+        self._listener.start()
+        self.logger.addHandler(self._handler)
+
+    def stop(self) -> None:
+        """Write out queued records and stop the writer thread"""
+        if self._listener is None:
+            return
+        self.logger.removeHandler(self._handler)
+        self._listener.stop()
+        self._listener = None
+
+    def log(
+            self,
+            scope: Scope,
+            endpoint: str,
+            status_code: int,
+            duration: float,
+            request_size: int = 0,
+            response_size: int = 0,
+            first_byte_time: Optional[float] = None,
+            request_id: Optional[str] = None
+    ) -> None:
+        """Log a finished request using timings measured by the caller"""
+        if self._listener is None:
+            return
+        if not self.sampler.should_log(status_code, duration):
+            _records_sampled_out.inc()
+            return
+
+        client = scope.get('client')
+        fields: Dict[str, Any] = {
+            "method": scope['method'],
+            "path": scope['path'],
+            "route": endpoint,
+            "status": status_code,
+            "duration": round(duration, 6),
+            "first_byte": round(first_byte_time, 6) if first_byte_time is not None else None,
+            "request_size": request_size,
+            "response_size": response_size,
+            "client": client[0] if client else None,
+            "request_id": request_id,
+        }
+        # Built directly: Logger.info would walk the stack to find the caller
+        record = logging.LogRecord(self.logger.name, logging.INFO, "", 0, "", None, None)
+        record.access = fields
+        self.logger.handle(record)
+        _records_logged.inc()
+
+
+access_logger = AccessLogger(
+    AccessLogSampler(
+        success_rate=settings.ACCESS_LOG_SUCCESS_SAMPLE_RATE,
+        slow_threshold=settings.ACCESS_LOG_SLOW_THRESHOLD,
+        error_status=settings.ACCESS_LOG_ERROR_STATUS
+    ),
+    json_output=settings.ACCESS_LOG_FORMAT == "json",
+    queue_size=settings.ACCESS_LOG_QUEUE_SIZE
+)
@@ -0,0 +1,157 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Generic, Optional, Tuple, TypeVar
+
+from app.metrics.cache_metrics import CacheMetrics, cache_metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Cached marker for "the loader found nothing"
+NOT_FOUND = object()
+
+
+class LocalCacheTier:
+    """In-process LRU cache with per-entry expiry"""
+
+    tier = "local"
+
+    def __init__(self, name: str, max_size: int, metrics: CacheMetrics = cache_metrics):
+        self.name = name
+        self.max_size = max_size
+        self.metrics = metrics
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.metrics.record_eviction(self.name, self.tier, "expired")
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.metrics.record_eviction(self.name, self.tier, "size")
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class SharedCacheTier:
+    """Cache tier backed by a Redis-compatible async client.
+
+    Any client exposing async ``get``, ``set(key, value, ex=...)`` and
+    ``delete`` works, which lets a local fake stand in for Redis. Errors from
+    the client are logged and treated as misses so reads never depend on it.
+    """
+
+    tier = "shared"
+
+    def __init__(self, client: Any, prefix: str):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Shared cache get failed: {e}")
+            return None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            await self.client.set(self.prefix + key, value, ex=max(int(ttl), 1))
+        except Exception as e:
+            logger.warning(f"Shared cache set failed: {e}")
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self.client.delete(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Shared cache delete failed: {e}")
+
+
+class ReadThroughCache(Generic[T]):
+    """Two-tier read-through cache.
+
+    Lookups go to the local tier, then the shared tier if configured, then the
+    loader. Loader results of ``None`` are cached for ``negative_ttl`` so
+    repeated lookups of missing keys don't reach the database either.
+
+    ``invalidate`` only reaches this process's local tier, so other workers
+    keep their local entries, cached misses included, until they expire.
+    ``local_ttl`` caps how long that is; it is the staleness bound whenever
+    more than one process writes.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            serialize: Callable[[T], bytes],
+            deserialize: Callable[[bytes], T],
+            ttl: float = 60.0,
+            negative_ttl: float = 5.0,
+            max_size: int = 10000,
+            local_ttl: Optional[float] = None,
+            shared: Optional[SharedCacheTier] = None,
+            metrics: CacheMetrics = cache_metrics
+    ):
+        self.name = name
+        self.serialize = serialize
+        self.deserialize = deserialize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.local_ttl = local_ttl
+        self.local = LocalCacheTier(name, max_size, metrics)
+        self.shared = shared
+        self.metrics = metrics
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Optional[T]]]) -> Optional[T]:
+        """Return the cached value for ``key``, calling ``loader`` on a miss"""
+        value = self.local.get(key)
+        if value is not None:
+            self.metrics.record_hit(self.name, self.local.tier)
+            return None if value is NOT_FOUND else value
+        self.metrics.record_miss(self.name, self.local.tier)
+
+        if self.shared is not None:
+            payload = await self.shared.get(key)
+            if payload is not None:
+                self.metrics.record_hit(self.name, self.shared.tier)
+                value = NOT_FOUND if payload == b"" else self.deserialize(payload)
+                self._set_local(key, value, self.negative_ttl if value is NOT_FOUND else self.ttl)
+                return None if value is NOT_FOUND else value
+            self.metrics.record_miss(self.name, self.shared.tier)
+
+        value = await loader()
+        ttl = self.ttl if value is not None else self.negative_ttl
+        self._set_local(key, value if value is not None else NOT_FOUND, ttl)
+        if self.shared is not None:
+            await self.shared.set(key, self.serialize(value) if value is not None else b"", ttl)
+        return value
+
+    def _set_local(self, key: str, value: Any, ttl: float) -> None:
+        if self.local_ttl is not None:
+            ttl = min(ttl, self.local_ttl)
+        self.local.set(key, value, ttl)
+
+    async def invalidate(self, key: str) -> None:
+        """Drop ``key`` from the shared tier and this process's local tier after a write"""
+        self.local.delete(key)
+        if self.shared is not None:
+            await self.shared.delete(key)
@@ -19,6 +19,34 @@ class Settings(BaseSettings):
     # Metrics
     metrics_enabled: bool = True
     metrics_endpoint: str = "/metrics"
+    # Raw paths remembered by the endpoint label resolver
+    metrics_route_cache_size: int = 1024
+    # Per-worker metric files, used when WORKERS_COUNT > 1
+    metrics_multiproc_dir: str = "/tmp/prometheus_multiproc"
+    # Seconds a rendered /metrics payload is reused across scrapes
+    metrics_cache_ttl: float = 1.0
+    # Relative-error latency quantiles per endpoint, next to the fixed buckets
+    metrics_latency_sketch_enabled: bool = False
+    metrics_latency_sketch_quantiles: List[float] = [0.5, 0.9, 0.99, 0.999]
+    metrics_latency_sketch_relative_accuracy: float = 0.01
+    metrics_latency_sketch_max_bins: int = 2048
+    metrics_latency_sketch_window: float = 60.0
+    # Seconds a /proc process metrics collection may take before it is logged
+    metrics_system_collect_budget: float = 0.005
+    # Event loop lag monitoring
+    metrics_loop_monitor_enabled: bool = True
+    metrics_loop_monitor_interval: float = 0.25
+    metrics_slow_callback_threshold: float = 0.1
+    metrics_track_slow_callbacks: bool = False
+    metrics_sample_blocked_stacks: bool = False
+    # Per-phase request timings (pool wait, queries, rendering) by route
+    metrics_request_phases_enabled: bool = True
+    # Send the phases in a Server-Timing header, always on when DEBUG is set
+    metrics_server_timing_enabled: bool = False
+    # Request ids as exemplars on duration and size buckets (OpenMetrics scrapes),
+    # at most one per bucket and series per interval
+    metrics_exemplars_enabled: bool = True
+    metrics_exemplar_interval: float = 1.0
 
     # Database settings
     DB_NAME: str = "prometheus-metrics-db"
@@ -30,11 +58,56 @@ class Settings(BaseSettings):
 
     DATABASE_POOL_SIZE: int = 10
     DATABASE_MAX_OVERFLOW: int = 20
+    # Connections opened concurrently at startup before /health reports ready
+    DATABASE_POOL_WARMUP: int = 5
+    DATABASE_POOL_WARMUP_TIMEOUT: float = 10.0
+
+    # Statements slower than SLOW_QUERY_THRESHOLD seconds are kept for
+    # /api/admin/slow-queries (needs ADMIN_TOKEN); on PostgreSQL their plans are captured with
+    # EXPLAIN, at most one per interval and once per fingerprint per cooldown
+    SLOW_QUERY_LOG_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD: float = 0.1
+    SLOW_QUERY_BUFFER_SIZE: int = 100
+    SLOW_QUERY_EXPLAIN_ENABLED: bool = True
+    SLOW_QUERY_EXPLAIN_INTERVAL: float = 1.0
+    SLOW_QUERY_EXPLAIN_COOLDOWN: float = 300.0
+    SLOW_QUERY_EXPLAIN_TIMEOUT: float = 5.0
+
+    # Slowest module imports logged at startup, 0 to disable
+    STARTUP_SLOW_IMPORTS_LOGGED: int = 10
 
     # Security settings
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     ALGORITHM: str = "HS256"
+    # Bearer token for /api/admin; the admin API is not served without one
+    ADMIN_TOKEN: Optional[str] = None
+    # bcrypt process pool; hashes beyond the queue limit are answered with 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    PASSWORD_HASH_ROUNDS: int = 12
+
+    # Response compression (gzip, or zstd when zstandard is installed)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    # Process CPU utilization above which the fastest level is used, and below
+    # which the best level is used
+    COMPRESSION_CPU_BUSY: float = 0.75
+    COMPRESSION_CPU_IDLE: float = 0.5
+
+    # Adaptive concurrency limit; requests that can't get a slot within
+    # CONCURRENCY_QUEUE_TIMEOUT seconds are answered with 503
+    CONCURRENCY_LIMIT_ENABLED: bool = True
+    CONCURRENCY_LIMIT_INITIAL: int = 50
+    CONCURRENCY_LIMIT_MIN: int = 10
+    CONCURRENCY_LIMIT_MAX: int = 500
+    # Latency growth over the long-term baseline tolerated before shrinking
+    CONCURRENCY_LIMIT_TOLERANCE: float = 2.0
+    CONCURRENCY_QUEUE_SIZE: int = 50
+    CONCURRENCY_QUEUE_TIMEOUT: float = 0.1
+    CONCURRENCY_RETRY_AFTER: int = 1
+    # Long-lived responses that bypass the limit instead of holding a permit
+    CONCURRENCY_EXEMPT_PATHS: List[str] = ["/api/v1/users/export", "/api/v1/users/bulk"]
 
     # CORS settings
     ALLOWED_CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000"]
@@ -42,8 +115,42 @@ class Settings(BaseSettings):
     # Redis settings (for caching/sessions)
     REDIS_URL: Optional[str] = None
 
+    # User read cache, shared through REDIS_URL when set
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_TTL: float = 60.0
+    USER_CACHE_NEGATIVE_TTL: float = 5.0
+    USER_CACHE_MAX_SIZE: int = 10000
+    # Invalidation only clears the writing worker's memory, so with several
+    # workers or REDIS_URL set, entries kept in memory expire after this many
+    # seconds; it bounds how long other workers serve a stale user or 404
+    USER_CACHE_LOCAL_TTL: float = 2.0
+    # Concurrent identical user reads share one query; results are reused for the window
+    USER_READ_COALESCING_ENABLED: bool = True
+    USER_READ_COALESCING_WINDOW: float = 0.1
+    USER_READ_COALESCING_MAX_RESULTS: int = 1000
+
+    # Cache-Control for user reads; clients revalidate with ETag / Last-Modified
+    USER_CACHE_CONTROL: str = "private, no-cache"
+
+    # Rows accepted by one bulk import. Every row is a bcrypt hash, about
+    # 0.25s at 12 rounds, spread over PASSWORD_HASH_WORKERS processes, so 100
+    # rows take roughly 12s with 2 workers; larger imports are sent in batches
+    USER_BULK_MAX_ROWS: int = 100
+
+    # Rows fetched and encoded per chunk by the user export
+    USER_EXPORT_BATCH_SIZE: int = 1000
+
     # Logging
     LOG_LEVEL: str = "INFO"
+    # Access log written from a background thread; "json" or "text"
+    ACCESS_LOG_ENABLED: bool = True
+    ACCESS_LOG_FORMAT: str = "json"
+    ACCESS_LOG_QUEUE_SIZE: int = 10000
+    # Statuses from ACCESS_LOG_ERROR_STATUS up and requests slower than
+    # ACCESS_LOG_SLOW_THRESHOLD seconds are always logged, the rest are sampled
+    ACCESS_LOG_SUCCESS_SAMPLE_RATE: float = 1.0
+    ACCESS_LOG_SLOW_THRESHOLD: float = 1.0
+    ACCESS_LOG_ERROR_STATUS: int = 500
 
     class Config:
         case_sensitive = True
@@ -1,12 +1,22 @@
+import asyncio
 import logging
+import time
+from typing import List, Optional, Set
+
 from sqlalchemy import MetaData
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 
 from app.core.config import settings
+from app.core.slow_queries import slow_query_log
+from app.metrics.db_metrics import InstrumentedAsyncQueuePool, db_metrics, instrument_engine
+from app.metrics.request_timing import span
 
 logger = logging.getLogger(__name__)
 
+# Warm-up connections closed after a timeout, referenced until they are done
+_cleanup_tasks: Set[asyncio.Future] = set()
+
 # Naming convention for constraints
 convention = {
     "ix": "ix_%(column_0_label)s",
@@ -22,20 +32,12 @@ metadata = MetaData(naming_convention=convention)
 class Base(DeclarativeBase):
     metadata = metadata
 
-print(settings.DATABASE_URL)
-# Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    pool_size=settings.DATABASE_POOL_SIZE,
-    max_overflow=settings.DATABASE_MAX_OVERFLOW,
-    pool_pre_ping=True,
-    pool_recycle=300
-)
 
-# Create async session factory
+# Created in the application lifespan by create_engine()
+engine: Optional[AsyncEngine] = None
+
+# Session factory, bound to the engine once it exists
 AsyncSessionLocal = async_sessionmaker(
-    engine,
     class_=AsyncSession,
     expire_on_commit=False,
     autocommit=False,
@@ -43,8 +45,75 @@ AsyncSessionLocal = async_sessionmaker(
 )
 
 
+def create_engine() -> AsyncEngine:
+    """Create the engine and bind the session factory to it"""
+    global engine
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        echo=settings.DEBUG,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=300,
+        poolclass=InstrumentedAsyncQueuePool
+    )
+    instrument_engine(engine)
+    if settings.SLOW_QUERY_LOG_ENABLED:
+        slow_query_log.attach(engine)
+    AsyncSessionLocal.configure(bind=engine)
+    return engine
+
+
+async def dispose_engine() -> None:
+    """Close pooled connections and drop the engine"""
+    global engine
+    if engine is not None:
+        await engine.dispose()
+        engine = None
+
+
+async def _close_started(connections: List[AsyncConnection]) -> None:
+    """Return warm-up connections to the pool, skipping ones that never opened"""
+    opened = [connection for connection in connections if connection.sync_connection is not None]
+    await asyncio.gather(*(connection.close() for connection in opened), return_exceptions=True)
+
+
+async def _close_after(starts: asyncio.Future, connections: List[AsyncConnection]) -> None:
+    await starts
+    await _close_started(connections)
+
+
+async def warm_up_pool(connections: int) -> int:
+    """Open pooled connections concurrently so first requests skip connection setup.
+
+    At most ``DATABASE_POOL_SIZE`` are opened, since overflow connections are
+    closed on checkin. Returns how many connections were opened. When the
+    caller is cancelled, e.g. by the warm-up timeout, connections still
+    opening are left to finish and go back to the pool in the background.
+    """
+    connections = min(connections, settings.DATABASE_POOL_SIZE)
+    pending = [engine.connect() for _ in range(connections)]
+    # All are held at once, otherwise the pool would hand out the same one
+    starts = asyncio.gather(*(connection.start() for connection in pending), return_exceptions=True)
+    try:
+        # A connect cancelled halfway can leave its connection checked out
+        results = await asyncio.shield(starts)
+    except asyncio.CancelledError:
+        cleanup = asyncio.ensure_future(_close_after(starts, pending))
+        _cleanup_tasks.add(cleanup)
+        cleanup.add_done_callback(_cleanup_tasks.discard)
+        raise
+    await asyncio.shield(_close_started(pending))
+
+    failures = [result for result in results if isinstance(result, BaseException)]
+    if failures:
+        logger.warning(f"Pool warm-up could not open {len(failures)} connections: {failures[0]}")
+    return sum(1 for result in results if not isinstance(result, BaseException))
+
+
 async def get_db() -> AsyncSession:
     """Dependency to get database session"""
+    start_time = time.perf_counter()
     async with AsyncSessionLocal() as session:
         try:
             yield session
@@ -53,7 +122,10 @@ async def get_db() -> AsyncSession:
             logger.error(f"Database session error: {e}")
             raise
         finally:
-            await session.close()
+            # Closing rolls back and returns the connection, a round trip of its own
+            with span("db_release"):
+                await session.close()
+            db_metrics.record_session(time.perf_counter() - start_time)
 
 
 async def init_db() -> None:
@@ -1,15 +1,33 @@
+import asyncio
+import time
+
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from contextlib import asynccontextmanager
-import time
 import logging
 
 
+from app.api.admin import admin_router
 from app.api.routers import api_router
+from app.core.access_log import access_logger
 from app.core.config import settings
+from app.core.database import create_engine, dispose_engine, warm_up_pool
+from app.core.security import password_hasher
+from app.core.slow_queries import slow_query_log
+from app.core.startup import import_profiler
 from app.metrics.base import metrics_router
 from app.metrics.http_metrics import HTTPMetrics
+from app.metrics.latency_sketch import LatencySketches
+from app.metrics.loop_metrics import EventLoopMonitor
+from app.metrics.multiprocess import is_multiprocess_enabled, mark_current_worker_dead, register_worker_collector
+from app.metrics.route_resolver import RouteResolver
+from app.metrics.startup_metrics import app_ready, db_pool_warmup_connections, startup_phase_seconds, startup_seconds
+from app.metrics.system_metrics import SystemMetrics
+from app.middlewares.compression_middleware import CompressionLevels, CompressionMiddleware
+from app.middlewares.concurrency_limit_middleware import ConcurrencyLimitMiddleware, GradientLimit
+from app.middlewares.logging_middleware import RequestLoggingMiddleware
 from app.middlewares.metrics_middleware import MetricsMiddleware
 
 # Configure logging
@@ -20,20 +38,83 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def warm_up(app: FastAPI) -> None:
+    """Open pooled connections, then report the worker ready.
+
+    A failed or slow warm-up is logged and the worker becomes ready anyway;
+    the pool then connects on demand as it would without warm-up.
+    """
+    start_time = time.perf_counter()
+    opened = 0
+    if settings.DATABASE_POOL_WARMUP > 0:
+        try:
+            opened = await asyncio.wait_for(
+                warm_up_pool(settings.DATABASE_POOL_WARMUP),
+                timeout=settings.DATABASE_POOL_WARMUP_TIMEOUT
+            )
+        except Exception as e:
+            logger.warning(f"Connection pool warm-up failed: {e!r}")
+    duration = time.perf_counter() - start_time
+    logger.info(f"Opened {opened} pooled connections in {duration:.3f}s")
+    startup_phase_seconds.labels(phase="pool_warmup").set(duration)
+    db_pool_warmup_connections.set(opened)
+
+    app.state.ready = True
+    app_ready.set(1)
+    startup_seconds.set(time.perf_counter() - import_profiler.started_at)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     logger.info("Starting up application...")
-    # await init_db()
-    logger.info("Database initialized")
+    start_time = time.perf_counter()
+    engine = create_engine()
+    startup_phase_seconds.labels(phase="engine").set(time.perf_counter() - start_time)
+    # Readiness follows warm-up, so /health can answer while it runs
+    warm_up_task = asyncio.create_task(warm_up(app))
+    password_hasher.start()
+    if settings.SLOW_QUERY_LOG_ENABLED:
+        slow_query_log.start(engine)
+    if settings.ACCESS_LOG_ENABLED:
+        access_logger.start()
+    loop_monitor = None
+    if settings.metrics_enabled and settings.metrics_loop_monitor_enabled:
+        loop_monitor = EventLoopMonitor(
+            interval=settings.metrics_loop_monitor_interval,
+            slow_callback_threshold=settings.metrics_slow_callback_threshold,
+            track_slow_callbacks=settings.metrics_track_slow_callbacks,
+            sample_blocked_stacks=settings.metrics_sample_blocked_stacks
+        )
+        await loop_monitor.start()
     yield
     # Shutdown
     logger.info("Shutting down application...")
+    app.state.ready = False
+    app_ready.set(0)
+    warm_up_task.cancel()
+    await asyncio.gather(warm_up_task, return_exceptions=True)
+    if loop_monitor is not None:
+        await loop_monitor.stop()
+    password_hasher.stop()
+    access_logger.stop()
+    await slow_query_log.stop()
+    await dispose_engine()
+    mark_current_worker_dead()
 
 
 def get_application() -> FastAPI:
     """Application factory"""
+    # Only known when started through app.core.startup.create_application
+    import_seconds = import_profiler.duration
+    if import_seconds is not None:
+        startup_phase_seconds.labels(phase="imports").set(import_seconds)
+        logger.info(f"Application imported in {import_seconds:.3f}s")
+        if settings.STARTUP_SLOW_IMPORTS_LOGGED > 0:
+            slowest = import_profiler.slowest(settings.STARTUP_SLOW_IMPORTS_LOGGED)
+            logger.info("Slowest imports: " + ", ".join(f"{name} {seconds * 1e3:.1f}ms" for name, seconds in slowest))
+
     app = FastAPI(
         title=settings.PROJECT_NAME,
         description="FastAPI application with PostgreSQL and SQLAlchemy",
@@ -57,33 +138,91 @@ def get_application() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Request-ID"],
     )
 
-    # Request logging middleware
-    @app.middleware("http")
-    async def log_requests(request: Request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        logger.info(
-            f"{request.method} {request.url.path} - "
-            f"Status: {response.status_code} - "
-            f"Time: {process_time:.4f}s"
+    # Response compression, inside the metrics middleware so sizes are as sent
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+            levels=CompressionLevels(busy=settings.COMPRESSION_CPU_BUSY, idle=settings.COMPRESSION_CPU_IDLE)
+        )
+
+    # Load shedding, inside the metrics middleware so shed requests are counted
+    if settings.CONCURRENCY_LIMIT_ENABLED:
+        app.add_middleware(
+            ConcurrencyLimitMiddleware,
+            limit=GradientLimit(
+                initial_limit=settings.CONCURRENCY_LIMIT_INITIAL,
+                min_limit=settings.CONCURRENCY_LIMIT_MIN,
+                max_limit=settings.CONCURRENCY_LIMIT_MAX,
+                tolerance=settings.CONCURRENCY_LIMIT_TOLERANCE
+            ),
+            queue_size=settings.CONCURRENCY_QUEUE_SIZE,
+            queue_timeout=settings.CONCURRENCY_QUEUE_TIMEOUT,
+            retry_after=settings.CONCURRENCY_RETRY_AFTER,
+            exempt_paths=settings.CONCURRENCY_EXEMPT_PATHS
         )
-        return response
 
     # Add metrics middleware
     if settings.metrics_enabled:
-        http_metrics = HTTPMetrics()
-        app.add_middleware(MetricsMiddleware, http_metrics=http_metrics)
+        latency_sketches = None
+        if settings.metrics_latency_sketch_enabled:
+            latency_sketches = LatencySketches(
+                'http_request_duration_sketch_seconds',
+                'HTTP request duration quantiles over a sliding window in seconds',
+                quantiles=settings.metrics_latency_sketch_quantiles,
+                relative_accuracy=settings.metrics_latency_sketch_relative_accuracy,
+                max_bins=settings.metrics_latency_sketch_max_bins,
+                window=settings.metrics_latency_sketch_window,
+                pid_label=is_multiprocess_enabled()
+            )
+            if is_multiprocess_enabled():
+                register_worker_collector(latency_sketches)
+        http_metrics = HTTPMetrics(
+            latency_sketches=latency_sketches,
+            exemplar_interval=settings.metrics_exemplar_interval
+        )
+        if is_multiprocess_enabled():
+            # The default registry isn't rendered from the worker files
+            register_worker_collector(SystemMetrics(
+                registry=None,
+                collect_budget=settings.metrics_system_collect_budget,
+                pid_label=True
+            ))
+        else:
+            SystemMetrics(collect_budget=settings.metrics_system_collect_budget)
+        route_resolver = RouteResolver(app.router, cache_size=settings.metrics_route_cache_size)
+        app.add_middleware(
+            MetricsMiddleware,
+            http_metrics=http_metrics,
+            route_resolver=route_resolver,
+            # Logged with the timings measured for the metrics
+            access_logger=access_logger if settings.ACCESS_LOG_ENABLED else None,
+            phase_timing=settings.metrics_request_phases_enabled,
+            server_timing=settings.metrics_server_timing_enabled or settings.DEBUG,
+            exemplars=settings.metrics_exemplars_enabled
+        )
+    elif settings.ACCESS_LOG_ENABLED:
+        # Request logging middleware
+        app.add_middleware(RequestLoggingMiddleware, access_logger=access_logger)
 
     # Include API routers with versioning
     app.include_router(api_router, prefix="/api")
+    # The admin API exposes query plans, it is only served behind a token
+    if settings.ADMIN_TOKEN:
+        app.include_router(admin_router, prefix="/api/admin")
     app.include_router(metrics_router)
 
+    # Not ready until the lifespan has warmed up the connection pool
+    app.state.ready = False
+
     # Health check endpoint
     @app.get("/health")
-    async def health_check():
+    async def health_check(request: Request):
+        if not request.app.state.ready:
+            return JSONResponse({"status": "starting", "version": "1.0.0"}, status_code=503)
         return {"status": "healthy", "version": "1.0.0"}
 
     return app
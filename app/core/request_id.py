@@ -0,0 +1,30 @@
+import random
+import re
+
+from starlette.types import Scope
+
+# W3C trace context: version-trace_id-parent_id-flags
+_TRACEPARENT = re.compile(r"[0-9a-f]{2}-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}")
+# Incoming X-Request-ID values end up in logs and exemplars, so only plain tokens are kept
+_REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+_INVALID_TRACE_ID = "0" * 32
+
+
+def generate_request_id() -> str:
+    """Random 128-bit id in trace id format; not meant to be unguessable"""
+    return f"{random.getrandbits(128):032x}"
+
+
+def get_request_id(scope: Scope) -> str:
+    """Trace id from ``traceparent``, else ``X-Request-ID``, else a new id"""
+    request_id = None
+    for name, value in scope.get('headers', ()):
+        if name == b'traceparent':
+            match = _TRACEPARENT.fullmatch(value.decode('latin-1').strip())
+            if match and match.group(1) != _INVALID_TRACE_ID:
+                return match.group(1)
+        elif name == b'x-request-id' and request_id is None:
+            value = value.decode('latin-1').strip()
+            if _REQUEST_ID.fullmatch(value):
+                request_id = value
+    return request_id or generate_request_id()
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+import bcrypt
+
+from app.core.config import settings
+from app.metrics.hashing_metrics import PasswordHashMetrics, password_hash_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherOverloaded(Exception):
+    """Raised when the hashing queue is full and the request should be shed"""
+
+
+class PasswordHasherUnavailable(PasswordHasherOverloaded):
+    """Raised when a pool worker died; the pool is rebuilt and the request can be retried"""
+
+
+def _hash_password(password: str, rounds: int) -> Tuple[str, float, float]:
+    """Hash in a pool worker, returning the hash, start time and duration"""
+    started_at = time.time()
+    start = time.perf_counter()
+    hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+    return hashed, started_at, time.perf_counter() - start
+
+
+def _verify_password(password: str, hashed: str) -> Tuple[bool, float, float]:
+    """Verify in a pool worker, returning the result, start time and duration"""
+    started_at = time.time()
+    start = time.perf_counter()
+    matches = bcrypt.checkpw(password.encode(), hashed.encode())
+    return matches, started_at, time.perf_counter() - start
+
+
+class PasswordHasher:
+    """bcrypt hashing in a bounded process pool.
+
+    Keeps 100-300ms of CPU per hash off the event loop. At most ``max_queue``
+    hashes may be submitted and unfinished at once; beyond that
+    ``PasswordHasherOverloaded`` is raised so callers can answer 503 instead of
+    piling up work. Before ``start()`` hashes run in a thread, bcrypt releases
+    the GIL, so scripts and tests work without the pool. If a worker dies the
+    pool is replaced and the affected hashes raise ``PasswordHasherUnavailable``.
+    """
+
+    def __init__(
+            self,
+            workers: int = 2,
+            max_queue: int = 64,
+            rounds: int = 12,
+            metrics: PasswordHashMetrics = password_hash_metrics
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self.metrics = metrics
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+
+    def start(self) -> None:
+        """Start the worker processes, called from the application lifespan"""
+        if self._pool is None:
+            self._pool = self._create_pool()
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        # Spawned rather than forked, the parent runs threads and an event loop
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _replace_broken_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Swap in a new pool once per broken one, concurrent failures share it"""
+        if self._pool is not pool:
+            return
+        logger.error("Password hashing worker died, restarting the process pool")
+        pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = self._create_pool()
+        self.metrics.password_hash_pool_restarts_total.inc()
+
+    def stop(self) -> None:
+        """Stop the worker processes, dropping queued work"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self, operation: str, func, *args):
+        if self._in_flight >= self.max_queue:
+            self.metrics.record_rejected(operation)
+            raise PasswordHasherOverloaded("Password hashing is overloaded, retry later")
+
+        self._in_flight += 1
+        self.metrics.password_hash_queue_depth.inc()
+        submitted_at = time.time()
+        try:
+            pool = self._pool
+            if pool is None:
+                result, started_at, duration = await asyncio.to_thread(func, *args)
+            else:
+                loop = asyncio.get_running_loop()
+                result, started_at, duration = await loop.run_in_executor(pool, func, *args)
+        except BrokenProcessPool:
+            # A worker was killed (e.g. out of memory); without a new pool every later hash fails
+            self._replace_broken_pool(pool)
+            raise PasswordHasherUnavailable("Password hashing is temporarily unavailable, retry later")
+        finally:
+            self._in_flight -= 1
+            self.metrics.password_hash_queue_depth.dec()
+
+        self.metrics.record_hash(operation, started_at - submitted_at, duration)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password"""
+        return await self._run("hash", _hash_password, password, self.rounds)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """Hash a batch, admitting at most one hash per worker at a time"""
+        hashed: List[str] = []
+        for start in range(0, len(passwords), self.workers):
+            window = passwords[start:start + self.workers]
+            hashed.extend(await asyncio.gather(*(self.hash(password) for password in window)))
+        return hashed
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        """Check a password against a stored hash"""
+        return await self._run("verify", _verify_password, password, hashed)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    rounds=settings.PASSWORD_HASH_ROUNDS,
+)
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Tuple, TypeVar
+
+from app.metrics.singleflight_metrics import SingleFlightMetrics, singleflight_metrics
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+class SingleFlight(Generic[T]):
+    """Coalesces concurrent identical calls into one.
+
+    The first caller for a key becomes the leader and runs the call; callers
+    arriving while it is in flight await the leader's result instead of
+    running their own. A finished result is also handed out for ``window``
+    seconds, keeping at most ``max_results`` of them.
+
+    If the leader raises, its waiters get the same exception. If the leader is
+    cancelled (its client went away), waiters are not: they retry and one of
+    them becomes the new leader.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            window: float = 0.0,
+            max_results: int = 1000,
+            metrics: SingleFlightMetrics = singleflight_metrics
+    ):
+        self.name = name
+        self.window = window
+        self.max_results = max_results
+        self.metrics = metrics
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._results: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Return the result of ``fn``, shared with concurrent calls for ``key``"""
+        while True:
+            result = self._recent(key)
+            if result is not _MISSING:
+                self.metrics.record_call(self.name, "window")
+                return result
+
+            future = self._in_flight.get(key)
+            if future is None:
+                return await self._lead(key, fn)
+
+            self.metrics.record_call(self.name, "coalesced")
+            try:
+                # Shielded so a waiter being cancelled doesn't cancel the leader
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+
+    def forget(self, key: Hashable) -> None:
+        """Drop a finished result so the next call runs again"""
+        self._results.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every finished result"""
+        self._results.clear()
+
+    async def _lead(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.metrics.record_call(self.name, "leader")
+        self.metrics.singleflight_in_flight.labels(group=self.name).inc()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            self.metrics.record_leader_failure(self.name, "cancelled")
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark it retrieved; the leader re-raises it either way
+            future.exception()
+            self.metrics.record_leader_failure(self.name, "error")
+            raise
+        finally:
+            del self._in_flight[key]
+            self.metrics.singleflight_in_flight.labels(group=self.name).dec()
+
+        future.set_result(result)
+        if self.window > 0:
+            self._remember(key, result)
+        return result
+
+    def _recent(self, key: Hashable) -> Any:
+        entry = self._results.get(key)
+        if entry is None:
+            return _MISSING
+
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._results[key]
+            return _MISSING
+        return result
+
+    def _remember(self, key: Hashable, result: Any) -> None:
+        self._results[key] = (time.monotonic() + self.window, result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.metrics.db_metrics import OTHER_FINGERPRINT, DatabaseMetrics, db_metrics, normalize_statement
+
+logger = logging.getLogger(__name__)
+
+# Plan fields holding names rather than expressions, left as they are
+_PLAN_IDENTIFIER_KEYS = frozenset({
+    "Node Type", "Relation Name", "Schema", "Alias", "Index Name", "CTE Name", "Function Name",
+    "Subplan Name", "Parent Relationship", "Strategy", "Join Type", "Scan Direction", "Operation",
+    "Partial Mode", "Command",
+})
+
+
+def scrub_plan(plan: Any, key: Optional[str] = None) -> Any:
+    """Replace literals in plan expressions, where the bound parameter values show up"""
+    if isinstance(plan, dict):
+        return {name: scrub_plan(value, name) for name, value in plan.items()}
+    if isinstance(plan, list):
+        return [scrub_plan(value, key) for value in plan]
+    if isinstance(plan, str) and key not in _PLAN_IDENTIFIER_KEYS:
+        return normalize_statement(plan)
+    return plan
+
+
+class SlowQuery:
+    """A statement that crossed the threshold, with its plan once captured"""
+
+    __slots__ = ('fingerprint', 'statement', 'duration', 'recorded_at', 'explain', 'plan')
+
+    def __init__(self, fingerprint: str, statement: str, duration: float):
+        self.fingerprint = fingerprint
+        self.statement = statement
+        self.duration = duration
+        self.recorded_at = datetime.now(timezone.utc)
+        # pending, captured, cached, failed, rate_limited, skipped or disabled
+        self.explain = "disabled"
+        self.plan: Optional[Any] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "statement": self.statement,
+            "duration": round(self.duration, 6),
+            "recorded_at": self.recorded_at.isoformat(),
+            "explain": self.explain,
+            "plan": self.plan,
+        }
+
+
+class SlowQueryLog:
+    """Records statements slower than ``threshold`` and captures their plans.
+
+    Slow statements are counted by fingerprint and kept, normalized, in a
+    ring buffer of ``buffer_size`` entries; parameters are never stored.
+    When ``explain`` is on and the engine is PostgreSQL, a background task
+    runs ``EXPLAIN (FORMAT JSON)`` with the original parameters on its own
+    unpooled connection, so it never takes a request's pool slot. Those
+    values appear as literals in the plan's conditions, so plans go through
+    ``scrub_plan`` before they are kept. At most one EXPLAIN is started per
+    ``explain_interval`` seconds and a fingerprint is explained again only
+    after ``explain_cooldown`` seconds; entries in between reuse the last plan
+    of their fingerprint.
+    """
+
+    def __init__(
+            self,
+            threshold: float = 0.1,
+            buffer_size: int = 100,
+            explain: bool = True,
+            explain_interval: float = 1.0,
+            explain_cooldown: float = 300.0,
+            explain_timeout: float = 5.0,
+            metrics: DatabaseMetrics = db_metrics
+    ):
+        self.threshold = threshold
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.explain_cooldown = explain_cooldown
+        self.explain_timeout = explain_timeout
+        self.metrics = metrics
+        self.entries: Deque[SlowQuery] = deque(maxlen=buffer_size)
+        self._plans: Dict[str, Tuple[float, Any]] = {}
+        self._last_explain = float('-inf')
+        self._queue: Optional["asyncio.Queue[Tuple[SlowQuery, str, Any]]"] = None
+        self._task: Optional[asyncio.Task] = None
+        self._explain_engine: Optional[AsyncEngine] = None
+
+    def attach(self, engine: AsyncEngine) -> None:
+        """Time statements executed on ``engine``"""
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if context is not None:
+                context.slow_query_start_time = time.perf_counter()
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            start_time = getattr(context, "slow_query_start_time", None)
+            if start_time is None:
+                return
+            duration = time.perf_counter() - start_time
+            if duration >= self.threshold:
+                self.record(statement, parameters, executemany, duration)
+
+    def start(self, engine: AsyncEngine) -> None:
+        """Start capturing plans for statements on ``engine``, PostgreSQL only"""
+        if not self.explain or self._task is not None or engine.dialect.name != "postgresql":
+            return
+        self._explain_engine = create_async_engine(engine.url, poolclass=NullPool)
+        self._queue = asyncio.Queue(maxsize=10)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await self._explain_engine.dispose()
+        self._task = self._queue = self._explain_engine = None
+
+    def record(self, statement: str, parameters: Any, executemany: bool, duration: float) -> None:
+        """Record a slow statement and schedule its EXPLAIN"""
+        fingerprint = self.metrics.fingerprint(statement)
+        self.metrics.db_slow_queries_total.labels(fingerprint=fingerprint).inc()
+        entry = SlowQuery(fingerprint, normalize_statement(statement), duration)
+        self.entries.append(entry)
+        if self._queue is None:
+            return
+
+        entry.explain = self._schedule_explain(entry, statement, parameters, executemany)
+        if entry.explain != "pending":
+            self.metrics.db_slow_query_explains_total.labels(outcome=entry.explain).inc()
+
+    def recent(self) -> List[SlowQuery]:
+        """Recorded slow statements, newest first"""
+        return list(reversed(self.entries))
+
+    def _schedule_explain(self, entry: SlowQuery, statement: str, parameters: Any, executemany: bool) -> str:
+        if executemany:
+            return "skipped"
+
+        now = time.monotonic()
+        # The shared overflow fingerprint covers different statements
+        if entry.fingerprint != OTHER_FINGERPRINT:
+            cached = self._plans.get(entry.fingerprint)
+            if cached is not None and now - cached[0] < self.explain_cooldown:
+                entry.plan = cached[1]
+                return "cached"
+
+        if now - self._last_explain < self.explain_interval:
+            return "rate_limited"
+        try:
+            self._queue.put_nowait((entry, statement, parameters))
+        except asyncio.QueueFull:
+            return "rate_limited"
+        self._last_explain = now
+        return "pending"
+
+    async def _run(self) -> None:
+        while True:
+            entry, statement, parameters = await self._queue.get()
+            try:
+                entry.plan = await asyncio.wait_for(self._explain(statement, parameters), self.explain_timeout)
+            except Exception as e:
+                entry.explain = "failed"
+                logger.warning(f"EXPLAIN of slow query {entry.fingerprint} failed: {e!r}")
+            else:
+                entry.explain = "captured"
+                self._plans[entry.fingerprint] = (time.monotonic(), entry.plan)
+            self.metrics.db_slow_query_explains_total.labels(outcome=entry.explain).inc()
+
+    async def _explain(self, statement: str, parameters: Any) -> Any:
+        # Plain EXPLAIN plans the statement without running it
+        async with self._explain_engine.connect() as conn:
+            result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = result.scalar()
+        return scrub_plan(json.loads(plan) if isinstance(plan, str) else plan)
+
+
+slow_query_log = SlowQueryLog(
+    threshold=settings.SLOW_QUERY_THRESHOLD,
+    buffer_size=settings.SLOW_QUERY_BUFFER_SIZE,
+    explain=settings.SLOW_QUERY_EXPLAIN_ENABLED,
+    explain_interval=settings.SLOW_QUERY_EXPLAIN_INTERVAL,
+    explain_cooldown=settings.SLOW_QUERY_EXPLAIN_COOLDOWN,
+    explain_timeout=settings.SLOW_QUERY_EXPLAIN_TIMEOUT
+)
@@ -0,0 +1,113 @@
+import sys
+import time
+from importlib.abc import MetaPathFinder
+from typing import Dict, List, Optional, Tuple
+
+
+class ImportProfiler:
+    """Times every module imported while it is running.
+
+    A finder placed first on ``sys.meta_path`` asks the other finders for the
+    spec and wraps the loader's ``exec_module`` on that loader instance, so
+    module attributes and loader types are untouched. Recorded times are self
+    times: imports nested inside a module are subtracted from it.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.stopped_at: Optional[float] = None
+        self.modules: Dict[str, float] = {}
+        self._children: List[float] = []
+        self._finder: Optional[_TimingFinder] = None
+
+    @property
+    def active(self) -> bool:
+        return self._finder is not None
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._finder = _TimingFinder(self)
+        sys.meta_path.insert(0, self._finder)
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds between ``start`` and ``stop``, None until it has run"""
+        if self.stopped_at is None:
+            return None
+        return self.stopped_at - self.started_at
+
+    def stop(self) -> float:
+        """Stop profiling, returns seconds since ``start``"""
+        if self._finder is not None:
+            if self._finder in sys.meta_path:
+                sys.meta_path.remove(self._finder)
+            self._finder = None
+            self.stopped_at = time.perf_counter()
+        return (self.stopped_at or time.perf_counter()) - self.started_at
+
+    def slowest(self, count: int) -> List[Tuple[str, float]]:
+        """Modules with the largest self time"""
+        return sorted(self.modules.items(), key=lambda item: item[1], reverse=True)[:count]
+
+    def _timed(self, exec_module):
+        profiler = self
+
+        def exec_timed(module):
+            if not profiler.active:
+                return exec_module(module)
+            profiler._children.append(0.0)
+            start_time = time.perf_counter()
+            try:
+                return exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - start_time
+                children = profiler._children.pop()
+                profiler.modules[module.__name__] = elapsed - children
+                if profiler._children:
+                    profiler._children[-1] += elapsed
+
+        exec_timed.profiled = True
+        return exec_timed
+
+
+class _TimingFinder(MetaPathFinder):
+    def __init__(self, profiler: ImportProfiler):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        loader = spec.loader
+        # Built-in and frozen importers are classes shared by every module;
+        # other loaders may serve several modules and are wrapped only once
+        exec_module = getattr(loader, "exec_module", None)
+        if exec_module is not None and not isinstance(loader, type) and not hasattr(exec_module, "profiled"):
+            try:
+                loader.exec_module = self.profiler._timed(exec_module)
+            except AttributeError:
+                pass
+        return spec
+
+
+import_profiler = ImportProfiler()
+
+
+def create_application():
+    """Server entrypoint: import the application under the profiler, then build it.
+
+    Profiling only covers this import, so scripts that import app modules
+    directly (alembic, benchmarks) never have the finder installed.
+    """
+    import_profiler.start()
+    try:
+        from app.core.main import get_application
+    finally:
+        import_profiler.stop()
+    return get_application()
@@ -0,0 +1,13 @@
+from prometheus_client import Counter
+
+access_log_records_total = Counter(
+    'access_log_records_total',
+    'Access log records by sampling outcome',
+    ['outcome']
+)
+
+access_log_dropped_total = Counter(
+    'access_log_dropped_total',
+    'Access log records lost because the queue was full or the write failed',
+    ['reason']
+)
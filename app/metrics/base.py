@@ -1,11 +1,22 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from fastapi.responses import Response
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+
+from app.core.config import settings
+from app.metrics.exposition import MetricsExposition
 
 metrics_router = APIRouter()
 
+metrics_exposition = MetricsExposition(ttl=settings.metrics_cache_ttl)
+
 
 # Custom metrics endpoint
 @metrics_router.get("/metrics")
-async def get_metrics():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+async def get_metrics(request: Request):
+    rendered = await metrics_exposition.render(
+        accept=request.headers.get('accept', ''),
+        accept_encoding=request.headers.get('accept-encoding', '')
+    )
+    headers = {'Vary': 'Accept, Accept-Encoding'}
+    if rendered.content_encoding:
+        headers['Content-Encoding'] = rendered.content_encoding
+    return Response(rendered.body, media_type=rendered.content_type, headers=headers)
@@ -0,0 +1,35 @@
+from prometheus_client import Counter, CollectorRegistry, REGISTRY
+
+
+class CacheMetrics:
+    def __init__(self, registry: CollectorRegistry = REGISTRY):
+        # Lookups per cache tier
+        self.cache_requests_total = Counter(
+            'cache_requests_total',
+            'Cache lookups by cache, tier and result',
+            ['cache', 'tier', 'result'],
+            registry=registry
+        )
+
+        # Entries dropped because of size limits or expiry
+        self.cache_evictions_total = Counter(
+            'cache_evictions_total',
+            'Cache entries evicted by cache, tier and reason',
+            ['cache', 'tier', 'reason'],
+            registry=registry
+        )
+
+    def record_hit(self, cache: str, tier: str):
+        """Record a cache hit"""
+        self.cache_requests_total.labels(cache=cache, tier=tier, result='hit').inc()
+
+    def record_miss(self, cache: str, tier: str):
+        """Record a cache miss"""
+        self.cache_requests_total.labels(cache=cache, tier=tier, result='miss').inc()
+
+    def record_eviction(self, cache: str, tier: str, reason: str):
+        """Record an evicted entry"""
+        self.cache_evictions_total.labels(cache=cache, tier=tier, reason=reason).inc()
+
+
+cache_metrics = CacheMetrics()
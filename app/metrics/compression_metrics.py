@@ -0,0 +1,28 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+compression_ratio = Histogram(
+    'http_compression_ratio',
+    'Compressed size divided by original size of compressed responses',
+    ['encoding'],
+    buckets=[0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0, 1.5]
+)
+
+compression_cpu_seconds = Histogram(
+    'http_compression_cpu_seconds',
+    'CPU time spent compressing a response in seconds',
+    ['encoding'],
+    buckets=[0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25]
+)
+
+compression_skipped_total = Counter(
+    'http_compression_skipped_total',
+    'Responses the client would accept compressed but that were sent as is',
+    ['reason']
+)
+
+compression_level = Gauge(
+    'http_compression_level',
+    'Compression level currently chosen from CPU headroom',
+    ['encoding'],
+    multiprocess_mode='liveall'
+)
@@ -0,0 +1,31 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+concurrency_limit = Gauge(
+    'http_concurrency_limit',
+    'Current adaptive limit on concurrent requests',
+    multiprocess_mode='livesum'
+)
+
+concurrency_in_flight = Gauge(
+    'http_concurrency_in_flight',
+    'Requests currently holding a concurrency permit',
+    multiprocess_mode='livesum'
+)
+
+concurrency_queue_length = Gauge(
+    'http_concurrency_queue_length',
+    'Requests waiting for a concurrency permit',
+    multiprocess_mode='livesum'
+)
+
+concurrency_queue_wait_seconds = Histogram(
+    'http_concurrency_queue_wait_seconds',
+    'Time requests waited for a concurrency permit in seconds',
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+)
+
+requests_shed_total = Counter(
+    'http_requests_shed_total',
+    'Requests rejected with 503 by the concurrency limiter',
+    ['reason']
+)
@@ -0,0 +1,201 @@
+import hashlib
+import re
+import time
+from typing import Dict, Set
+
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, REGISTRY
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.metrics.request_timing import add_span
+
+# Fingerprint shared by statements seen after the fingerprint limit is reached
+OTHER_FINGERPRINT = "__other__"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAMETER = re.compile(r"%\(\w+\)s|\$\d+|\?|(?<![:\w]):[A-Za-z_]\w*")
+_VALUE_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+([\w.\"]+)", re.IGNORECASE)
+
+
+def normalize_statement(statement: str) -> str:
+    """Strip literals, parameters and value lists so equivalent statements match"""
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _BIND_PARAMETER.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _VALUE_LIST.sub("(...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def fingerprint_statement(normalized: str) -> str:
+    """Short readable label for a normalized statement: operation, table and hash"""
+    operation = normalized.split(" ", 1)[0].upper()
+    table = _TABLE.search(normalized)
+    digest = hashlib.sha1(normalized.encode()).hexdigest()[:8]
+    return f"{operation} {table.group(1).strip(chr(34)) if table else '-'} {digest}"
+
+
+class DatabaseMetrics:
+    """Connection pool, query and session metrics for a SQLAlchemy engine.
+
+    Statements are normalized and fingerprinted; at most ``max_fingerprints``
+    distinct fingerprints become label values, anything beyond that is
+    recorded under ``OTHER_FINGERPRINT``.
+    """
+
+    def __init__(self, registry: CollectorRegistry = REGISTRY, max_fingerprints: int = 200):
+        self.max_fingerprints = max_fingerprints
+        self._fingerprints: Dict[str, str] = {}
+        self._labels: Set[str] = set()
+
+        # Time spent waiting for a connection from the pool
+        self.db_pool_checkout_seconds = Histogram(
+            'db_pool_checkout_seconds',
+            'Time waiting to check a connection out of the pool in seconds',
+            buckets=[0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0],
+            registry=registry
+        )
+
+        self.db_pool_connections_in_use = Gauge(
+            'db_pool_connections_in_use',
+            'Connections currently checked out of the pool',
+            registry=registry,
+            multiprocess_mode='livesum'
+        )
+
+        self.db_pool_overflow_connections = Gauge(
+            'db_pool_overflow_connections',
+            'Connections open beyond pool_size',
+            registry=registry,
+            multiprocess_mode='livesum'
+        )
+
+        self.db_pool_pre_ping_failures_total = Counter(
+            'db_pool_pre_ping_failures_total',
+            'Pooled connections that failed the pre-ping check',
+            registry=registry
+        )
+
+        self.db_pool_invalidations_total = Counter(
+            'db_pool_invalidations_total',
+            'Pooled connections invalidated',
+            registry=registry
+        )
+
+        # Query latency by statement fingerprint
+        self.db_query_duration_seconds = Histogram(
+            'db_query_duration_seconds',
+            'Database statement execution time in seconds',
+            ['fingerprint'],
+            buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0],
+            registry=registry
+        )
+
+        # Statements over the slow query threshold and their EXPLAIN captures
+        self.db_slow_queries_total = Counter(
+            'db_slow_queries_total',
+            'Statements slower than the slow query threshold',
+            ['fingerprint'],
+            registry=registry
+        )
+
+        self.db_slow_query_explains_total = Counter(
+            'db_slow_query_explains_total',
+            'EXPLAIN captures for slow statements by outcome',
+            ['outcome'],
+            registry=registry
+        )
+
+        self.db_session_duration_seconds = Histogram(
+            'db_session_duration_seconds',
+            'Lifetime of request database sessions in seconds',
+            buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
+            registry=registry
+        )
+
+    def fingerprint(self, statement: str) -> str:
+        """Return the bounded fingerprint label for a raw statement"""
+        fingerprint = self._fingerprints.get(statement)
+        if fingerprint is None:
+            fingerprint = fingerprint_statement(normalize_statement(statement))
+            if fingerprint not in self._labels:
+                if len(self._labels) >= self.max_fingerprints:
+                    fingerprint = OTHER_FINGERPRINT
+                else:
+                    self._labels.add(fingerprint)
+            # Raw statements are cached too, but only as many as the labels allow
+            if len(self._fingerprints) < self.max_fingerprints * 10:
+                self._fingerprints[statement] = fingerprint
+        return fingerprint
+
+    def record_query(self, statement: str, duration: float):
+        """Record a statement execution"""
+        self.db_query_duration_seconds.labels(fingerprint=self.fingerprint(statement)).observe(duration)
+
+    def record_session(self, duration: float):
+        """Record the lifetime of a request session"""
+        self.db_session_duration_seconds.observe(duration)
+
+    def record_checkout(self, pool):
+        """Record a connection leaving the pool"""
+        self.db_pool_connections_in_use.inc()
+        self.db_pool_overflow_connections.set(max(pool.overflow(), 0))
+
+    def record_checkin(self, pool):
+        """Record a connection returning to the pool"""
+        self.db_pool_connections_in_use.dec()
+        self.db_pool_overflow_connections.set(max(pool.overflow(), 0))
+
+
+db_metrics = DatabaseMetrics()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that times how long checkouts wait for a connection"""
+
+    def _do_get(self):
+        start_time = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            duration = time.perf_counter() - start_time
+            db_metrics.db_pool_checkout_seconds.observe(duration)
+            add_span("db_pool", duration)
+
+
+def instrument_engine(engine: AsyncEngine, metrics: DatabaseMetrics = db_metrics) -> None:
+    """Attach pool and statement event hooks to an async engine"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_start_time"].pop()
+        metrics.record_query(statement, duration)
+        add_span("db_query", duration)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        # Statements that raised never reach after_cursor_execute
+        if context.connection is not None and context.connection.info.get("query_start_time"):
+            context.connection.info["query_start_time"].pop()
+        if context.is_pre_ping:
+            metrics.db_pool_pre_ping_failures_total.inc()
+
+    @event.listens_for(sync_engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.record_checkout(sync_engine.pool)
+
+    @event.listens_for(sync_engine, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        metrics.record_checkin(sync_engine.pool)
+
+    @event.listens_for(sync_engine, "invalidate")
+    def invalidate(dbapi_connection, connection_record, exception):
+        metrics.db_pool_invalidations_total.inc()
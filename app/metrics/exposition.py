@@ -0,0 +1,97 @@
+import asyncio
+import gzip
+import time
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import CollectorRegistry, Gauge, Histogram
+from prometheus_client.exposition import choose_encoder, gzip_accepted
+
+from app.metrics.multiprocess import get_exposition_registry
+
+# Self-monitoring of the /metrics endpoint
+metrics_render_seconds = Histogram(
+    'metrics_render_seconds',
+    'Time spent rendering the /metrics exposition in seconds',
+    ['format'],
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+)
+
+metrics_payload_bytes = Gauge(
+    'metrics_payload_bytes',
+    'Size of the last rendered /metrics payload in bytes',
+    ['format', 'content_encoding'],
+    multiprocess_mode='livemostrecent'
+)
+
+
+def _format_name(content_type: str) -> str:
+    return 'openmetrics' if content_type.startswith('application/openmetrics-text') else 'text'
+
+
+class RenderedMetrics:
+    """A rendered exposition, kept alongside the time it was produced"""
+
+    def __init__(self, body: bytes, content_type: str, content_encoding: Optional[str]):
+        self.body = body
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+        self.rendered_at = time.monotonic()
+
+
+class MetricsExposition:
+    """Renders /metrics in a worker thread and caches the result.
+
+    One render per (format, encoding) pair is shared by every scrape arriving
+    within ``ttl`` seconds, including scrapes that arrive while the render is
+    still running, so HA Prometheus pairs don't double the cost. ``registry``
+    defaults to the worker's exposition registry.
+    """
+
+    def __init__(self, ttl: float = 1.0, registry: Optional[CollectorRegistry] = None):
+        self.ttl = ttl
+        self.registry = registry
+        self._cache: Dict[Tuple[str, bool], RenderedMetrics] = {}
+        self._pending: Dict[Tuple[str, bool], asyncio.Future] = {}
+
+    def _render(self, accept: str, compress: bool) -> RenderedMetrics:
+        """Render the exposition, runs off the event loop"""
+        encoder, content_type = choose_encoder(accept)
+
+        start_time = time.perf_counter()
+        registry = self.registry if self.registry is not None else get_exposition_registry()
+        body = encoder(registry)
+        metrics_render_seconds.labels(format=_format_name(content_type)).observe(
+            time.perf_counter() - start_time
+        )
+
+        content_encoding = None
+        if compress:
+            body = gzip.compress(body)
+            content_encoding = 'gzip'
+
+        metrics_payload_bytes.labels(
+            format=_format_name(content_type),
+            content_encoding=content_encoding or 'identity'
+        ).set(len(body))
+
+        return RenderedMetrics(body, content_type, content_encoding)
+
+    async def render(self, accept: str = '', accept_encoding: str = '') -> RenderedMetrics:
+        """Return a cached or freshly rendered exposition for the request headers"""
+        compress = gzip_accepted(accept_encoding)
+        key = (choose_encoder(accept)[1], compress)
+
+        cached = self._cache.get(key)
+        if cached is not None and time.monotonic() - cached.rendered_at < self.ttl:
+            return cached
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(asyncio.to_thread(self._render, accept, compress))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        # Shielded so a scraper hanging up doesn't cancel the shared render
+        rendered = await asyncio.shield(pending)
+        self._cache[key] = rendered
+        return rendered
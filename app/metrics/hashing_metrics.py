@@ -0,0 +1,54 @@
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, REGISTRY
+
+
+class PasswordHashMetrics:
+    def __init__(self, registry: CollectorRegistry = REGISTRY):
+        # Time spent hashing inside a pool worker
+        self.password_hash_seconds = Histogram(
+            'password_hash_seconds',
+            'Password hashing time in a pool worker in seconds',
+            ['operation'],
+            buckets=[0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5],
+            registry=registry
+        )
+
+        # Time between submitting a hash and a worker picking it up
+        self.password_hash_queue_wait_seconds = Histogram(
+            'password_hash_queue_wait_seconds',
+            'Time a password hash waited for a pool worker in seconds',
+            ['operation'],
+            buckets=[0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
+            registry=registry
+        )
+
+        self.password_hash_queue_depth = Gauge(
+            'password_hash_queue_depth',
+            'Password hashes submitted and not yet finished',
+            registry=registry,
+            multiprocess_mode='livesum'
+        )
+
+        self.password_hash_rejected_total = Counter(
+            'password_hash_rejected_total',
+            'Password hashes rejected because the queue was full',
+            ['operation'],
+            registry=registry
+        )
+
+        self.password_hash_pool_restarts_total = Counter(
+            'password_hash_pool_restarts_total',
+            'Hashing process pools replaced after a worker died',
+            registry=registry
+        )
+
+    def record_hash(self, operation: str, queue_wait: float, duration: float):
+        """Record a finished hash or verification"""
+        self.password_hash_queue_wait_seconds.labels(operation=operation).observe(max(queue_wait, 0.0))
+        self.password_hash_seconds.labels(operation=operation).observe(duration)
+
+    def record_rejected(self, operation: str):
+        """Record a hash rejected by the queue limit"""
+        self.password_hash_rejected_total.labels(operation=operation).inc()
+
+
+password_hash_metrics = PasswordHashMetrics()
@@ -1,13 +1,92 @@
-from prometheus_client import Counter, Histogram, Gauge
+from bisect import bisect_left
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import time
+
+from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, REGISTRY
+
+from app.metrics.latency_sketch import LatencySketches
+
+DURATION_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0]
+
+SIZE_BUCKETS = [64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304]
+
+
+class ExemplarSampler:
+    """Decides which observations of a histogram series carry an exemplar.
+
+    Prometheus keeps only the latest exemplar of each bucket, so an
+    observation is sampled when its bucket got no exemplar in the last
+    ``interval`` seconds. The cost stays flat as traffic grows, and rare slow
+    requests, which land in quiet buckets, are the ones almost always kept.
+    """
+
+    def __init__(self, buckets: Sequence[float], interval: float = 1.0):
+        self.bounds = list(buckets)
+        self.interval = interval
+
+    def slots(self) -> List[float]:
+        """Per-bucket sample times for a new series, +Inf included"""
+        return [float('-inf')] * (len(self.bounds) + 1)
+
+    def sample(self, slots: List[float], value: float, now: float) -> bool:
+        index = bisect_left(self.bounds, value)
+        if now - slots[index] < self.interval:
+            return False
+        slots[index] = now
+        return True
+
+
+class _RequestChildren(NamedTuple):
+    """Label children bound for one (method, endpoint, status_code)"""
+    requests_total: Any
+    duration: Any
+    request_size: Any
+    response_size: Any
+    first_byte: Any
+    last_byte: Any
+    sketch: Any
+    # Last exemplar time per bucket of the duration and size histograms
+    duration_exemplars: List[float]
+    request_size_exemplars: List[float]
+    response_size_exemplars: List[float]
 
 
 class HTTPMetrics:
-    def __init__(self):
+    """HTTP request metrics.
+
+    Label children are bound once per ``(method, endpoint, status_code)`` and
+    reused, so the hot path skips the ``.labels()`` lookup and its lock.
+
+    ``latency_sketches``, when given, receives every duration as well and is
+    registered next to the fixed-bucket histograms for accurate tail quantiles.
+
+    Requests recorded with a ``trace_id`` attach it as an exemplar to the
+    duration and size histograms, sampled per bucket every
+    ``exemplar_interval`` seconds. Exemplars are only exposed in the
+    OpenMetrics format and are not kept in multi-process mode.
+    """
+
+    def __init__(
+            self,
+            registry: CollectorRegistry = REGISTRY,
+            latency_sketches: Optional[LatencySketches] = None,
+            exemplar_interval: float = 1.0
+    ):
+        self.duration_exemplars = ExemplarSampler(DURATION_BUCKETS, exemplar_interval)
+        self.size_exemplars = ExemplarSampler(SIZE_BUCKETS, exemplar_interval)
+        self._children: Dict[Tuple[str, str, int], _RequestChildren] = {}
+        self._active_children: Dict[Tuple[str, str], Any] = {}
+        self._phase_children: Dict[Tuple[str, str], Any] = {}
+        self.latency_sketches = latency_sketches
+        if latency_sketches is not None:
+            registry.register(latency_sketches)
+
         # Request counters
         self.http_requests_total = Counter(
             'http_requests_total',
             'Total HTTP requests',
-            ['method', 'endpoint', 'status_code']
+            ['method', 'endpoint', 'status_code'],
+            registry=registry
         )
 
         # Request duration histogram
@@ -15,7 +94,26 @@ class HTTPMetrics:
             'http_request_duration_seconds',
             'HTTP request duration in seconds',
             ['method', 'endpoint'],
-            buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0]
+            buckets=DURATION_BUCKETS,
+            registry=registry
+        )
+
+        # Time until the first response body byte was handed to the server
+        self.http_response_first_byte_seconds = Histogram(
+            'http_response_first_byte_seconds',
+            'Time from request start to the first response body byte in seconds',
+            ['method', 'endpoint'],
+            buckets=DURATION_BUCKETS,
+            registry=registry
+        )
+
+        # Time until the last response body byte was handed to the server
+        self.http_response_last_byte_seconds = Histogram(
+            'http_response_last_byte_seconds',
+            'Time from request start to the last response body byte in seconds',
+            ['method', 'endpoint'],
+            buckets=DURATION_BUCKETS,
+            registry=registry
         )
 
         # Request size histogram
@@ -23,7 +121,8 @@ class HTTPMetrics:
             'http_request_size_bytes',
             'HTTP request size in bytes',
             ['method', 'endpoint'],
-            buckets=[64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304]
+            buckets=SIZE_BUCKETS,
+            registry=registry
         )
 
         # Response size histogram
@@ -31,62 +130,147 @@ class HTTPMetrics:
             'http_response_size_bytes',
             'HTTP response size in bytes',
             ['method', 'endpoint'],
-            buckets=[64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304]
+            buckets=SIZE_BUCKETS,
+            registry=registry
         )
 
         # Active requests gauge
         self.http_requests_active = Gauge(
             'http_requests_active',
             'Number of active HTTP requests',
-            ['method', 'endpoint']
+            ['method', 'endpoint'],
+            registry=registry,
+            # Summed over live workers only when running multi-process
+            multiprocess_mode='livesum'
+        )
+
+        # Time per request phase (pool wait, queries, rendering, ...)
+        self.http_request_phase_seconds = Histogram(
+            'http_request_phase_seconds',
+            'Time spent in a phase of an HTTP request in seconds',
+            ['endpoint', 'phase'],
+            buckets=[0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0],
+            registry=registry
         )
 
         # Application info
         self.http_requests_exceptions_total = Counter(
             'http_requests_exceptions_total',
             'Total HTTP requests that resulted in exceptions',
-            ['method', 'endpoint', 'exception_type']
+            ['method', 'endpoint', 'exception_type'],
+            registry=registry
         )
 
-    def record_request(
+    def _request_children(self, method: str, endpoint: str, status_code: int) -> _RequestChildren:
+        """Return the label children for a request, binding them on first use"""
+        key = (method, endpoint, status_code)
+        children = self._children.get(key)
+        if children is None:
+            children = _RequestChildren(
+                requests_total=self.http_requests_total.labels(
+                    method=method,
+                    endpoint=endpoint,
+                    status_code=str(status_code)
+                ),
+                duration=self.http_request_duration_seconds.labels(method=method, endpoint=endpoint),
+                request_size=self.http_request_size_bytes.labels(method=method, endpoint=endpoint),
+                response_size=self.http_response_size_bytes.labels(method=method, endpoint=endpoint),
+                first_byte=self.http_response_first_byte_seconds.labels(method=method, endpoint=endpoint),
+                last_byte=self.http_response_last_byte_seconds.labels(method=method, endpoint=endpoint),
+                sketch=(
+                    self.latency_sketches.sketch(method, endpoint)
+                    if self.latency_sketches is not None else None
+                ),
+                duration_exemplars=self.duration_exemplars.slots(),
+                request_size_exemplars=self.size_exemplars.slots(),
+                response_size_exemplars=self.size_exemplars.slots(),
+            )
+            self._children[key] = children
+        return children
+
+    def _active_child(self, method: str, endpoint: str):
+        """Return the active requests gauge child, binding it on first use"""
+        key = (method, endpoint)
+        child = self._active_children.get(key)
+        if child is None:
+            child = self.http_requests_active.labels(method=method, endpoint=endpoint)
+            self._active_children[key] = child
+        return child
+
+    def _observe(
             self,
             method: str,
             endpoint: str,
             status_code: int,
             duration: float,
-            request_size: int = 0,
-            response_size: int = 0
+            request_size: int,
+            response_size: int,
+            first_byte_time: Optional[float],
+            last_byte_time: Optional[float],
+            trace_id: Optional[str] = None
     ):
-        """Record metrics for a completed HTTP request"""
-        # Convert status code to string
-        status_str = str(status_code)
+        """Apply one request's observations to the bound children"""
+        children = self._request_children(method, endpoint, status_code)
 
-        # Record request count
-        self.http_requests_total.labels(
-            method=method,
-            endpoint=endpoint,
-            status_code=status_str
-        ).inc()
+        exemplar = None
+        if trace_id is not None:
+            now = time.monotonic()
+            exemplar = {'trace_id': trace_id}
 
-        # Record duration
-        self.http_request_duration_seconds.labels(
-            method=method,
-            endpoint=endpoint
-        ).observe(duration)
+        # Record request count and duration
+        children.requests_total.inc()
+        if exemplar and self.duration_exemplars.sample(children.duration_exemplars, duration, now):
+            children.duration.observe(duration, exemplar)
+        else:
+            children.duration.observe(duration)
+        if children.sketch is not None:
+            children.sketch.observe(duration)
 
-        # Record request size
+        # Record request and response sizes
         if request_size > 0:
-            self.http_request_size_bytes.labels(
-                method=method,
-                endpoint=endpoint
-            ).observe(request_size)
-
-        # Record response size
+            if exemplar and self.size_exemplars.sample(children.request_size_exemplars, request_size, now):
+                children.request_size.observe(request_size, exemplar)
+            else:
+                children.request_size.observe(request_size)
         if response_size > 0:
-            self.http_response_size_bytes.labels(
-                method=method,
-                endpoint=endpoint
-            ).observe(response_size)
+            if exemplar and self.size_exemplars.sample(children.response_size_exemplars, response_size, now):
+                children.response_size.observe(response_size, exemplar)
+            else:
+                children.response_size.observe(response_size)
+
+        # Record streaming timings, only known once the body has been sent
+        if first_byte_time is not None:
+            children.first_byte.observe(first_byte_time)
+        if last_byte_time is not None:
+            children.last_byte.observe(last_byte_time)
+
+    def record_request(
+            self,
+            method: str,
+            endpoint: str,
+            status_code: int,
+            duration: float,
+            request_size: int = 0,
+            response_size: int = 0,
+            first_byte_time: Optional[float] = None,
+            last_byte_time: Optional[float] = None,
+            trace_id: Optional[str] = None
+    ):
+        """Record metrics for a completed HTTP request"""
+        self._observe(
+            method, endpoint, status_code, duration,
+            request_size, response_size, first_byte_time, last_byte_time, trace_id
+        )
+
+    def record_phases(self, endpoint: str, phases: Dict[str, float]):
+        """Record the phase durations of a completed request"""
+        for phase, duration in phases.items():
+            key = (endpoint, phase)
+            child = self._phase_children.get(key)
+            if child is None:
+                child = self.http_request_phase_seconds.labels(endpoint=endpoint, phase=phase)
+                self._phase_children[key] = child
+            child.observe(duration)
 
     def record_exception(self, method: str, endpoint: str, exception_type: str):
         """Record an exception for a request"""
@@ -98,14 +282,8 @@ class HTTPMetrics:
 
     def start_request(self, method: str, endpoint: str):
         """Mark the start of a request"""
-        self.http_requests_active.labels(
-            method=method,
-            endpoint=endpoint
-        ).inc()
+        self._active_child(method, endpoint).inc()
 
     def end_request(self, method: str, endpoint: str):
         """Mark the end of a request"""
-        self.http_requests_active.labels(
-            method=method,
-            endpoint=endpoint
-        ).dec()
\ No newline at end of file
+        self._active_child(method, endpoint).dec()
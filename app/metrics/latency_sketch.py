@@ -0,0 +1,191 @@
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from prometheus_client.metrics_core import Metric
+from prometheus_client.registry import Collector
+
+
+class DDSketch:
+    """Mergeable quantile sketch with a relative-error guarantee.
+
+    Values are counted in logarithmic bins so any quantile is returned within
+    ``relative_accuracy`` of the true value. At most ``max_bins`` bins are
+    kept; beyond that the lowest bins are collapsed, which only affects the
+    accuracy of the lowest quantiles and leaves the tail exact.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048, min_value: float = 1e-9):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Add an observation"""
+        self.count += count
+        if value <= self.min_value:
+            self.zero_count += count
+            return
+
+        key = self._key(value)
+        self.bins[key] = self.bins.get(key, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        """Fold the lowest bins together until the bin limit holds"""
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        target = keys[excess]
+        for key in keys[:excess]:
+            self.bins[target] += self.bins.pop(key)
+
+    def merge(self, other: "DDSketch") -> None:
+        """Add every observation of another sketch with the same accuracy"""
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        """Return the estimate for each quantile in ``qs`` (sorted ascending)"""
+        if self.count == 0:
+            return [None] * len(qs)
+
+        results: List[Optional[float]] = []
+        ranks = iter([q * (self.count - 1) for q in qs])
+        rank = next(ranks)
+
+        # Walk the bins once for every requested quantile
+        seen = self.zero_count
+        while seen > rank:
+            results.append(0.0)
+            try:
+                rank = next(ranks)
+            except StopIteration:
+                return results
+
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            while seen > rank:
+                results.append(self._value(key))
+                try:
+                    rank = next(ranks)
+                except StopIteration:
+                    return results
+
+        # Rounding can leave the top quantiles past the last bin
+        highest = self._value(max(self.bins)) if self.bins else 0.0
+        results.extend([highest] * (len(qs) - len(results)))
+        return results
+
+
+class WindowedSketch:
+    """DDSketch over a sliding time window, plus lifetime count and sum.
+
+    The window is split into ``slots`` sub-sketches that are rotated as time
+    passes, so quantiles describe recent traffic rather than the whole
+    process lifetime.
+    """
+
+    def __init__(self, relative_accuracy: float, max_bins: int, window: float, slots: int = 5):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.slot_duration = window / slots
+        self._slots: List[Tuple[int, DDSketch]] = []
+        self._slot_count = slots
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        slot = int(time.monotonic() // self.slot_duration)
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            if not self._slots or self._slots[-1][0] != slot:
+                self._slots.append((slot, DDSketch(self.relative_accuracy, self.max_bins)))
+                del self._slots[:-self._slot_count]
+            self._slots[-1][1].add(value)
+
+    def snapshot(self, qs: Sequence[float]) -> Tuple[List[Optional[float]], int, float]:
+        """Return quantiles over the window and the lifetime count and sum"""
+        oldest = int(time.monotonic() // self.slot_duration) - self._slot_count + 1
+        merged = DDSketch(self.relative_accuracy, self.max_bins)
+        with self._lock:
+            for slot, sketch in self._slots:
+                if slot >= oldest:
+                    merged.merge(sketch)
+            count, total = self.count, self.sum
+        return merged.quantiles(qs), count, total
+
+
+class LatencySketches(Collector):
+    """Per (method, endpoint) latency sketches exported as summary quantiles.
+
+    Sketches live in the worker's memory, not in the multi-process files. In
+    multi-process mode they are rendered through the exposition registry with
+    ``pid_label``, so each scrape has the quantiles of the worker serving it.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            quantiles: Iterable[float] = (0.5, 0.9, 0.99, 0.999),
+            relative_accuracy: float = 0.01,
+            max_bins: int = 2048,
+            window: float = 60.0,
+            pid_label: bool = False
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.quantiles = sorted(quantiles)
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.window = window
+        self.pid_label = pid_label
+        self._sketches: Dict[Tuple[str, str], WindowedSketch] = {}
+        self._lock = threading.Lock()
+
+    def sketch(self, method: str, endpoint: str) -> WindowedSketch:
+        """Return the sketch for a label pair, creating it on first use"""
+        key = (method, endpoint)
+        sketch = self._sketches.get(key)
+        if sketch is None:
+            with self._lock:
+                sketch = self._sketches.setdefault(
+                    key, WindowedSketch(self.relative_accuracy, self.max_bins, self.window)
+                )
+        return sketch
+
+    def collect(self) -> Iterable[Metric]:
+        metric = Metric(self.name, self.documentation, 'summary')
+        with self._lock:
+            sketches = list(self._sketches.items())
+        pid = {'pid': str(os.getpid())} if self.pid_label else {}
+
+        for (method, endpoint), sketch in sketches:
+            values, count, total = sketch.snapshot(self.quantiles)
+            labels = {'method': method, 'endpoint': endpoint, **pid}
+            for q, value in zip(self.quantiles, values):
+                if value is not None:
+                    metric.add_sample(self.name, dict(labels, quantile=str(q)), value)
+            metric.add_sample(self.name + '_count', labels, count)
+            metric.add_sample(self.name + '_sum', labels, total)
+        yield metric
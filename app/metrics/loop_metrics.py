@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+event_loop_lag_seconds = Histogram(
+    'asyncio_event_loop_lag_seconds',
+    'Delay between when the loop monitor should have woken up and when it did',
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+)
+
+event_loop_tasks_pending = Gauge(
+    'asyncio_tasks_pending',
+    'Number of asyncio tasks not yet done',
+    multiprocess_mode='livesum'
+)
+
+slow_callbacks_total = Counter(
+    'asyncio_slow_callbacks_total',
+    'Event loop callbacks that ran longer than the slow callback threshold',
+    ['callback']
+)
+
+slow_callback_duration_seconds = Histogram(
+    'asyncio_slow_callback_duration_seconds',
+    'Duration of event loop callbacks above the slow callback threshold',
+    buckets=[0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+)
+
+event_loop_blocked_total = Counter(
+    'asyncio_event_loop_blocked_total',
+    'Times the watchdog found the event loop blocked and sampled its stack'
+)
+
+
+def _callback_name(handle: asyncio.Handle) -> str:
+    """Name a loop callback, using the coroutine for task steps"""
+    callback = handle._callback
+    task = getattr(callback, '__self__', None)
+    if isinstance(task, asyncio.Task):
+        coro = task.get_coro()
+        return getattr(coro, '__qualname__', type(coro).__name__)
+    return getattr(callback, '__qualname__', type(callback).__name__)
+
+
+class EventLoopMonitor:
+    """Reports how responsive the running event loop is.
+
+    A monitor task sleeps for ``interval`` and records how late it wakes up as
+    scheduling lag, along with the number of pending tasks. Optionally every
+    loop callback is timed and those above ``slow_callback_threshold`` are
+    counted by callback, and a watchdog thread samples the loop thread's stack
+    while it is blocked. Callback timing hooks ``asyncio.Handle`` and so only
+    applies to the stdlib loop, not uvloop.
+    """
+
+    def __init__(
+            self,
+            interval: float = 0.25,
+            slow_callback_threshold: float = 0.1,
+            track_slow_callbacks: bool = False,
+            sample_blocked_stacks: bool = False,
+            max_stack_samples: int = 20
+    ):
+        self.interval = interval
+        self.slow_callback_threshold = slow_callback_threshold
+        self.track_slow_callbacks = track_slow_callbacks
+        self.sample_blocked_stacks = sample_blocked_stacks
+        self.blocked_stacks: Deque[str] = deque(maxlen=max_stack_samples)
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._original_handle_run = None
+
+    async def start(self) -> None:
+        """Start monitoring the running loop"""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._monitor())
+
+        if self.track_slow_callbacks:
+            self._patch_handle_run()
+
+        if self.sample_blocked_stacks:
+            self._watchdog = threading.Thread(
+                target=self._watch, name="event-loop-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop monitoring and undo the callback hook"""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._original_handle_run is not None:
+            asyncio.Handle._run = self._original_handle_run
+            self._original_handle_run = None
+
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.interval * 2)
+            self._watchdog = None
+
+    async def _monitor(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            event_loop_lag_seconds.observe(max(loop.time() - expected, 0.0))
+            event_loop_tasks_pending.set(len(asyncio.all_tasks(loop)))
+            self._heartbeat = time.monotonic()
+
+    def _patch_handle_run(self) -> None:
+        """Time every loop callback by wrapping ``Handle._run``"""
+        original = asyncio.Handle._run
+        threshold = self.slow_callback_threshold
+
+        def _run(handle):
+            start_time = time.perf_counter()
+            try:
+                return original(handle)
+            finally:
+                duration = time.perf_counter() - start_time
+                if duration >= threshold:
+                    name = _callback_name(handle)
+                    slow_callbacks_total.labels(callback=name).inc()
+                    slow_callback_duration_seconds.observe(duration)
+                    logger.warning(f"Slow event loop callback {name} took {duration:.3f}s")
+
+        self._original_handle_run = original
+        asyncio.Handle._run = _run
+
+    def _watch(self) -> None:
+        """Sample the loop thread's stack once per stall"""
+        sampled_heartbeat = None
+        while not self._stopped.wait(self.interval):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for < self.slow_callback_threshold or heartbeat == sampled_heartbeat:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+
+            sampled_heartbeat = heartbeat
+            stack = "".join(traceback.format_stack(frame))
+            self.blocked_stacks.append(stack)
+            event_loop_blocked_total.inc()
+            logger.warning(f"Event loop blocked for {stalled_for:.3f}s in:\n{stack}")
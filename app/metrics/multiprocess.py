@@ -0,0 +1,94 @@
+import os
+import re
+import shutil
+from typing import List, Optional
+
+from prometheus_client import CollectorRegistry, REGISTRY
+from prometheus_client import multiprocess
+from prometheus_client.registry import Collector
+
+# prometheus_client picks its value class from this variable when the first
+# metric is created, so it has to be exported before the workers start
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# Gauge files that only make sense while their process is alive
+_LIVE_GAUGE_FILE = re.compile(r"^gauge_live\w+?_(\d+)\.db$")
+
+# Collectors rendered next to the merged files, with values of the scraped worker only
+_worker_collectors: List[Collector] = []
+
+
+def get_multiprocess_dir() -> Optional[str]:
+    """Directory holding the per-PID metric files, or None in single-process mode"""
+    return os.environ.get(MULTIPROC_DIR_ENV) or None
+
+
+def is_multiprocess_enabled() -> bool:
+    """Whether metrics are written to shared per-PID files"""
+    return get_multiprocess_dir() is not None
+
+
+def prepare_multiprocess_dir(path: str) -> None:
+    """Export the multi-process directory and clear files left by a previous run.
+
+    Must be called by the parent process before any worker imports
+    prometheus_client, otherwise the workers keep in-process values.
+    """
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+    os.environ[MULTIPROC_DIR_ENV] = path
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def mark_dead_workers(path: str) -> None:
+    """Drop live-only gauge files of workers that exited without cleaning up.
+
+    Counter and histogram files of dead workers are kept on purpose: their
+    totals must keep contributing to the merged values or counters would go
+    backwards after a worker restart.
+    """
+    for filename in os.listdir(path):
+        match = _LIVE_GAUGE_FILE.match(filename)
+        if match and not _pid_alive(int(match.group(1))):
+            multiprocess.mark_process_dead(int(match.group(1)), path)
+
+
+def mark_current_worker_dead() -> None:
+    """Remove this worker's live-only gauges, called on shutdown"""
+    path = get_multiprocess_dir()
+    if path is not None:
+        multiprocess.mark_process_dead(os.getpid(), path)
+
+
+def register_worker_collector(collector: Collector) -> None:
+    """Render ``collector`` with the merged metrics in multi-process mode"""
+    _worker_collectors.append(collector)
+
+
+def get_exposition_registry() -> CollectorRegistry:
+    """Registry to render on /metrics.
+
+    In multi-process mode a fresh registry merges the files of every worker,
+    live and dead, applying each gauge's ``multiprocess_mode`` aggregation.
+    Worker collectors are added to it as they are, reporting only the worker
+    serving the scrape.
+    """
+    path = get_multiprocess_dir()
+    if path is None:
+        return REGISTRY
+
+    mark_dead_workers(path)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=path)
+    for collector in _worker_collectors:
+        registry.register(collector)
+    return registry
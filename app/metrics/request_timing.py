@@ -0,0 +1,62 @@
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Iterator, Optional, Tuple
+import time
+
+
+class RequestTiming:
+    """Time spent in named phases of one request.
+
+    Spans with the same name add up, so a phase covers every query or render
+    of the request. Phases may overlap: a selector span contains the query
+    spans run inside it.
+    """
+
+    __slots__ = ('phases',)
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, duration: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        """Format the phases as a ``Server-Timing`` header value in milliseconds"""
+        entries = [f"{name};dur={duration * 1e3:.3f}" for name, duration in self.phases.items()]
+        if total is not None:
+            entries.append(f"total;dur={total * 1e3:.3f}")
+        return ", ".join(entries)
+
+
+_current_timing: ContextVar[Optional[RequestTiming]] = ContextVar('request_timing', default=None)
+
+
+def start_request_timing() -> Tuple[RequestTiming, Token]:
+    """Start timing the current request; pass the token to ``end_request_timing``"""
+    timing = RequestTiming()
+    return timing, _current_timing.set(timing)
+
+
+def end_request_timing(token: Token) -> None:
+    _current_timing.reset(token)
+
+
+def add_span(name: str, duration: float) -> None:
+    """Add a measured duration to the current request, if one is being timed"""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.add(name, duration)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block as phase ``name`` of the current request"""
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - start_time)
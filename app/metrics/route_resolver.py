@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from starlette.routing import BaseRoute, Mount, Router
+
+
+# Endpoint label shared by every path that matches no route (404s, scanners)
+UNMATCHED_ENDPOINT = "__unmatched__"
+
+
+class RouteResolver:
+    """Maps raw request paths to route templates for the ``endpoint`` label.
+
+    The route table is compiled once, on first use, so routers included after
+    the resolver is created are still picked up. Resolved paths are kept in a
+    bounded LRU cache and unknown paths collapse into ``UNMATCHED_ENDPOINT``,
+    which keeps the number of label sets bounded by the number of routes.
+    """
+
+    def __init__(self, router: Router, cache_size: int = 1024):
+        self.router = router
+        self.cache_size = cache_size
+        self._static: Optional[Dict[str, str]] = None
+        self._dynamic: List[Tuple[Pattern, str]] = []
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+
+    def _compile(self, routes: List[BaseRoute]) -> None:
+        """Collect static paths and path regexes from the route table"""
+        for route in routes:
+            path_regex = getattr(route, 'path_regex', None)
+            if path_regex is None:
+                continue
+
+            if isinstance(route, Mount):
+                # Everything below a mount shares the mount's template
+                self._dynamic.append((path_regex, route.path + "/{path}"))
+            elif route.param_convertors:
+                self._dynamic.append((path_regex, route.path))
+            else:
+                self._static.setdefault(route.path, route.path)
+
+    def _build(self) -> None:
+        self._static = {}
+        self._dynamic = []
+        self._compile(self.router.routes)
+
+    def _match(self, path: str) -> str:
+        """Find the template for a path by scanning the compiled route table"""
+        template = self._static.get(path)
+        if template is not None:
+            return template
+
+        for path_regex, template in self._dynamic:
+            if path_regex.match(path):
+                return template
+
+        return UNMATCHED_ENDPOINT
+
+    def resolve(self, path: str) -> str:
+        """Return the route template for a raw request path"""
+        if self._static is None:
+            self._build()
+
+        template = self._cache.get(path)
+        if template is not None:
+            self._cache.move_to_end(path)
+            return template
+
+        template = self._match(path)
+
+        # Only matched paths are cached so scanner traffic can't evict them
+        if template != UNMATCHED_ENDPOINT:
+            self._cache[path] = template
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return template
@@ -0,0 +1,39 @@
+from prometheus_client import Counter, Gauge, CollectorRegistry, REGISTRY
+
+
+class SingleFlightMetrics:
+    def __init__(self, registry: CollectorRegistry = REGISTRY):
+        # Calls by how they were answered: leader ran the query, coalesced
+        # waited on a leader, window reused a result that just finished
+        self.singleflight_requests_total = Counter(
+            'singleflight_requests_total',
+            'Single-flight calls by group and role',
+            ['group', 'role'],
+            registry=registry
+        )
+
+        self.singleflight_leader_failures_total = Counter(
+            'singleflight_leader_failures_total',
+            'Leader calls that raised or were cancelled while others waited',
+            ['group', 'reason'],
+            registry=registry
+        )
+
+        self.singleflight_in_flight = Gauge(
+            'singleflight_in_flight',
+            'Distinct calls currently in flight',
+            ['group'],
+            registry=registry,
+            multiprocess_mode='livesum'
+        )
+
+    def record_call(self, group: str, role: str):
+        """Record how a call was answered"""
+        self.singleflight_requests_total.labels(group=group, role=role).inc()
+
+    def record_leader_failure(self, group: str, reason: str):
+        """Record a leader that raised or was cancelled"""
+        self.singleflight_leader_failures_total.labels(group=group, reason=reason).inc()
+
+
+singleflight_metrics = SingleFlightMetrics()
@@ -0,0 +1,26 @@
+from prometheus_client import Gauge
+
+startup_phase_seconds = Gauge(
+    'app_startup_phase_seconds',
+    'Duration of each worker startup phase in seconds',
+    ['phase'],
+    multiprocess_mode='liveall'
+)
+
+startup_seconds = Gauge(
+    'app_startup_seconds',
+    'Seconds from the first application import until the worker reported ready',
+    multiprocess_mode='liveall'
+)
+
+app_ready = Gauge(
+    'app_ready',
+    'Whether the worker finished startup; /health answers 503 until it has',
+    multiprocess_mode='livemin'
+)
+
+db_pool_warmup_connections = Gauge(
+    'db_pool_warmup_connections',
+    'Connections opened by the pool warm-up at startup',
+    multiprocess_mode='livesum'
+)
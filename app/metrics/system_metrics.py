@@ -1,221 +1,180 @@
 # app/metrics/system_metrics.py
-import time
-import psutil
-import threading
-from typing import Dict, Any
-from prometheus_client import Counter, Gauge, Histogram, Info, start_http_server
-import gc
+import logging
 import os
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from prometheus_client import PROCESS_COLLECTOR, REGISTRY, CollectorRegistry
+from prometheus_client.metrics_core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+logger = logging.getLogger(__name__)
+
+
+class SystemMetrics(Collector):
+    """Process metrics read from /proc in a single pass on every scrape.
+
+    Replaces prometheus_client's default ``ProcessCollector`` in the registry,
+    so the standard ``process_*`` names are exported exactly once. GC and
+    platform information stay with the default ``GCCollector`` and
+    ``PlatformCollector``. There is no background thread: the files are only
+    read while a scrape is collecting.
+
+    In multi-process mode the default registry is not rendered, so the
+    collector is created with ``registry=None`` and ``pid_label`` and added to
+    the exposition registry instead. Each scrape then carries the process
+    metrics of the worker that served it, labelled with its pid; the other
+    workers' values are not in that scrape.
+    """
+
+    def __init__(
+            self,
+            registry: Optional[CollectorRegistry] = REGISTRY,
+            proc_path: str = "/proc/self",
+            collect_budget: float = 0.005,
+            pid_label: bool = False
+    ):
+        self.proc_path = proc_path
+        self.pid_label = pid_label
+        self.collect_budget = collect_budget
+        self.last_collect_duration = 0.0
+
+        # Constants needed to turn /proc values into seconds and bytes
+        self._ticks = os.sysconf('SC_CLK_TCK')
+        self._pagesize = os.sysconf('SC_PAGE_SIZE')
+        self._boot_time = self._read_boot_time()
+        self.available = self._boot_time is not None and os.path.exists(proc_path)
+
+        if registry is not None:
+            if self.available:
+                # Take over the process_* names from the default collector
+                try:
+                    registry.unregister(PROCESS_COLLECTOR)
+                except KeyError:
+                    pass
+            registry.register(self)
 
-
-class SystemMetrics:
-    def __init__(self):
-        # CPU Metrics
-        self.process_cpu_seconds_total = Counter(
-            'process_cpu_seconds_total',
-            'Total CPU time consumed by the process'
-        )
-
-        # Memory Metrics
-        self.process_resident_memory_bytes = Gauge(
-            'process_resident_memory_bytes',
-            'Physical memory currently used by the process'
-        )
-
-        self.process_virtual_memory_bytes = Gauge(
-            'process_virtual_memory_bytes',
-            'Virtual memory allocated by the process'
-        )
-
-        # Process Info
-        self.process_start_time_seconds = Gauge(
-            'process_start_time_seconds',
-            'Start time of the process since unix epoch'
-        )
-
-        self.process_uptime_seconds = Gauge(
-            'process_uptime_seconds',
-            'Process uptime in seconds'
-        )
-
-        # File Descriptors
-        self.process_open_fds = Gauge(
-            'process_open_fds',
-            'Number of open file descriptors'
-        )
-
-        self.process_max_fds = Gauge(
-            'process_max_fds',
-            'Maximum number of open file descriptors'
-        )
-
-        # Garbage Collection
-        self.python_gc_objects_collected_total = Counter(
-            'python_gc_objects_collected_total',
-            'Objects collected during gc',
-            ['generation']
-        )
-
-        self.python_gc_collections_total = Counter(
-            'python_gc_collections_total',
-            'Number of times this generation was collected',
-            ['generation']
-        )
-
-        # Thread Count
-        self.python_threads = Gauge(
-            'python_threads',
-            'Number of Python threads'
-        )
-
-        # Application Info
-        self.python_info = Info(
-            'python_info',
-            'Python platform information'
-        )
-
-        # Initialize
-        self.process = psutil.Process()
-        self.start_time = time.time()
-        self.last_cpu_time = 0
-        self.last_gc_stats = self._get_gc_stats()
-
-        # Set static metrics
-        self.process_start_time_seconds.set(self.start_time)
-        self._set_python_info()
-
-        # Start background collection
-        self._start_metrics_collection()
-
-    def _set_python_info(self):
-        """Set Python platform information"""
-        import sys
-        import platform
-
-        self.python_info.info({
-            'version': sys.version,
-            'implementation': platform.python_implementation(),
-            'platform': platform.platform()
-        })
-
-    def _get_gc_stats(self) -> Dict[str, Any]:
-        """Get garbage collection statistics"""
-        stats = {}
-        for generation in range(3):
-            try:
-                stat = gc.get_stats()[generation]
-                stats[generation] = {
-                    'collections': stat.get('collections', 0),
-                    'collected': stat.get('collected', 0),
-                    'uncollectable': stat.get('uncollectable', 0)
-                }
-            except (IndexError, AttributeError):
-                stats[generation] = {'collections': 0, 'collected': 0, 'uncollectable': 0}
-        return stats
-
-    def _update_cpu_metrics(self):
-        """Update CPU metrics"""
-        try:
-            # Get current CPU time
-            cpu_time = self.process.cpu_times()
-            total_cpu_time = cpu_time.user + cpu_time.system
-
-            # Update total CPU time counter
-            cpu_delta = total_cpu_time - self.last_cpu_time
-            if cpu_delta > 0:
-                self.process_cpu_seconds_total.inc(cpu_delta)
-            self.last_cpu_time = total_cpu_time
-
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-
-    def _update_memory_metrics(self):
-        """Update memory metrics"""
-        try:
-            memory_info = self.process.memory_info()
-            self.process_resident_memory_bytes.set(memory_info.rss)
-            self.process_virtual_memory_bytes.set(memory_info.vms)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-
-    def _update_fd_metrics(self):
-        """Update file descriptor metrics"""
-        try:
-            # Open file descriptors
-            num_fds = self.process.num_fds()
-            self.process_open_fds.set(num_fds)
-
-            # Max file descriptors
-            try:
-                import resource
-                max_fds = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
-                self.process_max_fds.set(max_fds)
-            except (ImportError, OSError):
-                pass
-
-        except (psutil.NoSuchProcess, psutil.AccessDenied, AttributeError):
-            pass
-
-    def _update_gc_metrics(self):
-        """Update garbage collection metrics"""
+    def _read_boot_time(self) -> Optional[float]:
+        """Get system boot time from /proc/stat"""
         try:
-            current_stats = self._get_gc_stats()
-
-            for generation in range(3):
-                gen_str = str(generation)
-                current = current_stats.get(generation, {})
-                last = self.last_gc_stats.get(generation, {})
-
-                # Update counters with deltas
-                collections_delta = current.get('collections', 0) - last.get('collections', 0)
-                collected_delta = current.get('collected', 0) - last.get('collected', 0)
-
-                if collections_delta > 0:
-                    self.python_gc_collections_total.labels(generation=gen_str).inc(collections_delta)
-
-                if collected_delta > 0:
-                    self.python_gc_objects_collected_total.labels(generation=gen_str).inc(collected_delta)
-
-            self.last_gc_stats = current_stats
-
-        except Exception:
+            with open("/proc/stat", "rb") as stat:
+                for line in stat:
+                    if line.startswith(b"btime "):
+                        return float(line.split()[1])
+        except OSError:
             pass
-
-    def _update_thread_metrics(self):
-        """Update thread count metrics"""
+        return None
+
+    def _read(self, name: str) -> bytes:
+        with open(os.path.join(self.proc_path, name), "rb") as f:
+            return f.read()
+
+    def _read_stat(self) -> Dict[str, float]:
+        """Parse CPU time, thread count and start time from stat"""
+        # The command name may contain spaces, fields start after its ')'
+        fields = self._read("stat").rpartition(b")")[2].split()
+        return {
+            'cpu': (float(fields[11]) + float(fields[12])) / self._ticks,
+            'threads': float(fields[17]),
+            'start_time': float(fields[19]) / self._ticks + self._boot_time,
+        }
+
+    def _read_statm(self) -> Dict[str, float]:
+        """Parse virtual and resident memory from statm"""
+        fields = self._read("statm").split()
+        return {
+            'virtual': float(fields[0]) * self._pagesize,
+            'resident': float(fields[1]) * self._pagesize,
+        }
+
+    def _read_max_fds(self) -> Optional[float]:
+        """Get the soft limit on open files from limits"""
+        for line in self._read("limits").splitlines():
+            if line.startswith(b"Max open files"):
+                value = line.split()[3]
+                return None if value == b"unlimited" else float(value)
+        return None
+
+    def _family(self, family_class: type, name: str, documentation: str, value: float) -> Metric:
+        if not self.pid_label:
+            return family_class(name, documentation, value=value)
+        family = family_class(name, documentation, labels=['pid'])
+        family.add_metric([str(os.getpid())], value)
+        return family
+
+    def collect(self) -> Iterable[Metric]:
+        if not self.available:
+            return []
+
+        start_time = time.perf_counter()
         try:
-            thread_count = threading.active_count()
-            self.python_threads.set(thread_count)
-        except Exception:
-            pass
-
-    def _update_uptime_metrics(self):
-        """Update uptime metrics"""
-        uptime = time.time() - self.start_time
-        self.process_uptime_seconds.set(uptime)
-
-    def _collect_metrics(self):
-        """Collect all system metrics"""
-        self._update_cpu_metrics()
-        self._update_memory_metrics()
-        self._update_fd_metrics()
-        self._update_gc_metrics()
-        self._update_thread_metrics()
-        self._update_uptime_metrics()
-
-    def _start_metrics_collection(self):
-        """Start background metrics collection"""
-
-        def collect_loop():
-            while True:
-                try:
-                    self._collect_metrics()
-                    time.sleep(5)  # Collect every 5 seconds
-                except Exception:
-                    # Continue collecting even if there's an error
-                    time.sleep(5)
-
-        thread = threading.Thread(target=collect_loop, daemon=True)
-        thread.start()
-
-
+            stat = self._read_stat()
+            statm = self._read_statm()
+            open_fds = len(os.listdir(os.path.join(self.proc_path, "fd")))
+            max_fds = self._read_max_fds()
+        except (OSError, IndexError, ValueError) as e:
+            logger.debug(f"Could not read process metrics: {e}")
+            return []
+
+        metrics = [
+            self._family(
+                CounterMetricFamily, 'process_cpu_seconds',
+                'Total user and system CPU time spent in seconds.',
+                stat['cpu']
+            ),
+            self._family(
+                GaugeMetricFamily, 'process_virtual_memory_bytes',
+                'Virtual memory size in bytes.',
+                statm['virtual']
+            ),
+            self._family(
+                GaugeMetricFamily, 'process_resident_memory_bytes',
+                'Resident memory size in bytes.',
+                statm['resident']
+            ),
+            self._family(
+                GaugeMetricFamily, 'process_start_time_seconds',
+                'Start time of the process since unix epoch in seconds.',
+                stat['start_time']
+            ),
+            self._family(
+                GaugeMetricFamily, 'process_uptime_seconds',
+                'Process uptime in seconds',
+                time.time() - stat['start_time']
+            ),
+            self._family(
+                GaugeMetricFamily, 'process_open_fds',
+                'Number of open file descriptors.',
+                open_fds
+            ),
+            self._family(
+                GaugeMetricFamily, 'process_threads',
+                'Number of OS threads in the process',
+                stat['threads']
+            ),
+            self._family(
+                GaugeMetricFamily, 'python_threads',
+                'Number of Python threads',
+                threading.active_count()
+            ),
+        ]
+        if max_fds is not None:
+            metrics.append(self._family(
+                GaugeMetricFamily, 'process_max_fds',
+                'Maximum number of open file descriptors.',
+                max_fds
+            ))
+
+        self.last_collect_duration = time.perf_counter() - start_time
+        if self.last_collect_duration > self.collect_budget:
+            logger.warning(
+                f"Process metrics collection took {self.last_collect_duration * 1000:.2f}ms, "
+                f"over the {self.collect_budget * 1000:.2f}ms budget"
+            )
+        metrics.append(self._family(
+            GaugeMetricFamily, 'process_metrics_collect_seconds',
+            'Time spent reading /proc for process metrics in seconds',
+            self.last_collect_duration
+        ))
+        return metrics
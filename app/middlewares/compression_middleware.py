@@ -0,0 +1,283 @@
+import time
+import zlib
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics.compression_metrics import (
+    compression_cpu_seconds,
+    compression_level,
+    compression_ratio,
+    compression_skipped_total,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Fast, balanced and best levels per encoding
+LEVELS: Dict[str, Tuple[int, int, int]] = {
+    "zstd": (1, 3, 6),
+    "gzip": (1, 4, 6),
+}
+
+# Preferred first when the client accepts several with the same q-value
+ENCODINGS = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/openmetrics-text",
+    "application/xml",
+    "application/javascript",
+    "text/",
+)
+
+
+def _is_compressible(message: Message) -> bool:
+    """Whether a response start message has a compressible content type"""
+    for name, value in message.get('headers', ()):
+        if name == b'content-type':
+            return value.decode('latin-1').startswith(COMPRESSIBLE_TYPES)
+    return False
+
+
+@lru_cache(maxsize=256)
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header"""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressionLevels:
+    """Chooses a compression level from the process's recent CPU use.
+
+    CPU time is sampled at most once per ``interval`` when a level is asked
+    for. Above ``busy`` utilization the fastest level is used, below ``idle``
+    the best, and the balanced level in between.
+    """
+
+    def __init__(self, busy: float = 0.75, idle: float = 0.5, interval: float = 1.0):
+        self.busy = busy
+        self.idle = idle
+        self.interval = interval
+        self.utilization = 0.0
+        self._sampled_at = time.monotonic()
+        self._cpu_time = time.process_time()
+
+    def level(self, encoding: str) -> int:
+        now = time.monotonic()
+        if now - self._sampled_at >= self.interval:
+            cpu_time = time.process_time()
+            self.utilization = (cpu_time - self._cpu_time) / (now - self._sampled_at)
+            self._sampled_at, self._cpu_time = now, cpu_time
+
+        fast, balanced, best = LEVELS[encoding]
+        if self.utilization >= self.busy:
+            level = fast
+        elif self.utilization <= self.idle:
+            level = best
+        else:
+            level = balanced
+        compression_level.labels(encoding=encoding).set(level)
+        return level
+
+
+def _compressor(encoding: str, level: int) -> Tuple[Callable[[bytes], bytes], Callable[[], bytes], Callable[[], bytes]]:
+    """Return (compress, flush, finish) for a streaming compressor"""
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        return (
+            compressor.compress,
+            lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+            compressor.flush,
+        )
+    # wbits 31 writes a gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return (
+        compressor.compress,
+        lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+        compressor.flush,
+    )
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses with zstd or gzip.
+
+    The encoding comes from Accept-Encoding, zstd only when the optional
+    ``zstandard`` package is installed. Bodies below ``minimum_size`` are
+    sent as is; streaming bodies are buffered only until they reach it, then
+    every chunk is compressed and flushed as it arrives. Responses that are
+    already encoded or not of a compressible type pass through.
+
+    Every response of a compressible type carries ``Vary: Accept-Encoding``,
+    including those sent uncompressed because of their size, status or the
+    client's Accept-Encoding, so shared caches keep the variants apart.
+
+    Install it inside ``MetricsMiddleware`` so response sizes are counted as
+    sent on the wire.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            minimum_size: int = 1024,
+            levels: Optional[CompressionLevels] = None
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = levels or CompressionLevels()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope.get('headers', ()):
+            if name == b'accept-encoding':
+                accept_encoding = value.decode('latin-1')
+                break
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            async def send_with_vary(message: Message) -> None:
+                if message['type'] == 'http.response.start' and _is_compressible(message):
+                    MutableHeaders(scope=message).add_vary_header('Accept-Encoding')
+                await send(message)
+
+            await self.app(scope, receive, send_with_vary)
+            return
+
+        responder = _CompressingResponder(send, encoding, self.minimum_size, self.levels)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int, levels: CompressionLevels):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.levels = levels
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.started = False
+        self.start_sent = False
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.original_size = 0
+        self.compressed_size = 0
+        self.cpu_time = 0.0
+        self._compress = self._flush = self._finish = None
+
+    async def send(self, message: Message) -> None:
+        message_type = message['type']
+        if message_type == 'http.response.start':
+            self.start_message = message
+            self.passthrough = self._skip_reason(message) is not None
+            if self.passthrough:
+                await self._send(message)
+            return
+
+        if message_type != 'http.response.body' or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+
+        if not self.started:
+            self.buffer.append(body)
+            self.buffered += len(body)
+            if self.buffered < self.minimum_size:
+                if more_body:
+                    return
+                # Finished below the threshold: send it as it is
+                compression_skipped_total.labels(reason='small').inc()
+                MutableHeaders(scope=self.start_message).add_vary_header('Accept-Encoding')
+                await self._send(self.start_message)
+                await self._send({'type': 'http.response.body', 'body': b''.join(self.buffer)})
+                return
+            body = b''.join(self.buffer)
+            self.buffer = []
+            await self._start(more_body)
+
+        self.original_size += len(body)
+        cpu_start = time.thread_time()
+        if more_body:
+            compressed = self._compress(body) + self._flush()
+        else:
+            compressed = self._compress(body) + self._finish()
+        self.cpu_time += time.thread_time() - cpu_start
+        self.compressed_size += len(compressed)
+
+        if not more_body:
+            self._record()
+        if not self.start_sent:
+            # Whole body in one message, so its compressed length is known
+            MutableHeaders(scope=self.start_message)['content-length'] = str(len(compressed))
+            await self._send(self.start_message)
+            self.start_sent = True
+        if compressed or not more_body:
+            await self._send({'type': 'http.response.body', 'body': compressed, 'more_body': more_body})
+
+    def _skip_reason(self, message: Message) -> Optional[str]:
+        status = message['status']
+        if status < 200 or status in (204, 206, 304):
+            compression_skipped_total.labels(reason='status').inc()
+            if _is_compressible(message):
+                MutableHeaders(scope=message).add_vary_header('Accept-Encoding')
+            return 'status'
+        content_type = b''
+        for name, value in message.get('headers', ()):
+            if name == b'content-encoding':
+                compression_skipped_total.labels(reason='encoded').inc()
+                return 'encoded'
+            if name == b'content-type':
+                content_type = value
+        if not content_type.decode('latin-1').startswith(COMPRESSIBLE_TYPES):
+            compression_skipped_total.labels(reason='type').inc()
+            return 'type'
+        return None
+
+    async def _start(self, more_body: bool) -> None:
+        """Set up the compressor and headers, sending the start when streaming"""
+        self._compress, self._flush, self._finish = _compressor(
+            self.encoding, self.levels.level(self.encoding)
+        )
+        headers = MutableHeaders(scope=self.start_message)
+        del headers['content-length']
+        headers['content-encoding'] = self.encoding
+        headers.add_vary_header('Accept-Encoding')
+        # The compressed body is a different representation of the resource
+        etag = headers.get('etag')
+        if etag and etag.startswith('"'):
+            headers['etag'] = 'W/' + etag
+        self.started = True
+
+        if more_body:
+            await self._send(self.start_message)
+            self.start_sent = True
+
+    def _record(self) -> None:
+        if self.original_size:
+            compression_ratio.labels(encoding=self.encoding).observe(self.compressed_size / self.original_size)
+        compression_cpu_seconds.labels(encoding=self.encoding).observe(self.cpu_time)
@@ -0,0 +1,210 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Iterable, List, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.metrics.concurrency_metrics import (
+    concurrency_in_flight,
+    concurrency_limit,
+    concurrency_queue_length,
+    concurrency_queue_wait_seconds,
+    requests_shed_total,
+)
+
+
+class GradientLimit:
+    """Concurrency limit tuned from latency, after Netflix's Gradient2.
+
+    Request latencies are averaged over ``window`` seconds (the short-term
+    RTT) and folded into a slow exponential average (the long-term RTT). The
+    limit is scaled by ``tolerance * long / short``, clamped to [0.5, 1], plus
+    a headroom of sqrt(limit): it grows while latency stays near its usual
+    level and shrinks as soon as requests start queueing behind a slow
+    dependency. The limit is left alone while the server is under half
+    utilized, since latency then says nothing about capacity.
+    """
+
+    def __init__(
+            self,
+            initial_limit: int = 50,
+            min_limit: int = 10,
+            max_limit: int = 500,
+            tolerance: float = 2.0,
+            smoothing: float = 0.2,
+            window: float = 0.1,
+            long_window: int = 600
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.window = window
+        self.long_window = long_window
+        self.long_rtt = 0.0
+        self._long_samples = 0
+        self._window_start = time.monotonic()
+        self._window_sum = 0.0
+        self._window_count = 0
+        self._window_max_in_flight = 0
+        concurrency_limit.set(self.limit)
+
+    def on_sample(self, latency: float, in_flight: int) -> None:
+        """Record a finished request, updating the limit once per window"""
+        self._window_sum += latency
+        self._window_count += 1
+        self._window_max_in_flight = max(self._window_max_in_flight, in_flight)
+
+        now = time.monotonic()
+        if now - self._window_start < self.window:
+            return
+        short_rtt = self._window_sum / self._window_count
+        max_in_flight = self._window_max_in_flight
+        self._window_start = now
+        self._window_sum = 0.0
+        self._window_count = 0
+        self._window_max_in_flight = 0
+        self._update(short_rtt, max_in_flight)
+
+    def _update(self, short_rtt: float, max_in_flight: int) -> None:
+        # Long-term RTT, a plain average until enough windows were seen
+        self._long_samples += 1
+        if self._long_samples <= 10:
+            self.long_rtt += (short_rtt - self.long_rtt) / self._long_samples
+        else:
+            self.long_rtt += (short_rtt - self.long_rtt) * 2 / (self.long_window + 1)
+
+        # Let the baseline recover after a long stretch of higher latency
+        if self.long_rtt / short_rtt > 2:
+            self.long_rtt *= 0.95
+
+        if max_in_flight < self.limit / 2:
+            return
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / short_rtt))
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        new_limit = self.limit * (1 - self.smoothing) + new_limit * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, new_limit))
+        concurrency_limit.set(self.limit)
+
+
+class ConcurrencyLimitMiddleware:
+    """Pure ASGI middleware bounding concurrent requests by an adaptive limit.
+
+    Requests above the limit wait in a short priority queue; paths in
+    ``priority_paths`` (health checks and scrapes) are served first and are
+    never turned away. Others get 503 with ``Retry-After`` when the queue is
+    full or their wait exceeds ``queue_timeout``, so work the server can't
+    finish in time is refused up front rather than timing out half done.
+
+    Paths in ``exempt_paths`` bypass the limiter: long-lived responses such
+    as exports would hold a permit for minutes and their latency would skew
+    the limit.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            limit: GradientLimit,
+            queue_size: int = 50,
+            queue_timeout: float = 0.1,
+            retry_after: int = 1,
+            priority_paths: Iterable[str] = ("/health", "/metrics"),
+            exempt_paths: Iterable[str] = ()
+    ):
+        self.app = app
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.priority_paths = frozenset(priority_paths)
+        self.exempt_paths = frozenset(exempt_paths)
+        self.in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['path'] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        priority = scope['path'] in self.priority_paths
+        if not await self._acquire(priority):
+            await self._shed(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if not priority:
+                self.limit.on_sample(time.perf_counter() - start_time, self.in_flight)
+            self._release()
+
+    async def _acquire(self, priority: bool) -> bool:
+        """Take a permit, waiting in the queue if needed; False if the request is shed"""
+        if self.in_flight < self.limit.limit and not self._waiters:
+            self.in_flight += 1
+            concurrency_in_flight.set(self.in_flight)
+            return True
+
+        if not priority and len(self._waiters) >= self.queue_size:
+            requests_shed_total.labels(reason='queue_full').inc()
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (0 if priority else 1, next(self._sequence), future))
+        concurrency_queue_length.set(len(self._waiters))
+        start_time = time.perf_counter()
+        try:
+            # Priority requests wait as long as it takes
+            await asyncio.wait_for(future, None if priority else self.queue_timeout)
+        except asyncio.TimeoutError:
+            # From 3.12 the timeout can still be raised for a permit handed over
+            # in the same loop turn; the request keeps it
+            if future.done() and not future.cancelled():
+                return True
+            self._remove_waiter(future)
+            requests_shed_total.labels(reason='queue_timeout').inc()
+            return False
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # A permit handed over just before the client went away goes back
+                self._release()
+            else:
+                self._remove_waiter(future)
+            raise
+        finally:
+            concurrency_queue_wait_seconds.observe(time.perf_counter() - start_time)
+        return True
+
+    def _remove_waiter(self, future: asyncio.Future) -> None:
+        self._waiters = [waiter for waiter in self._waiters if waiter[2] is not future]
+        heapq.heapify(self._waiters)
+        concurrency_queue_length.set(len(self._waiters))
+
+    def _release(self) -> None:
+        """Return a permit, handing it to the next waiter while under the limit"""
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < self.limit.limit:
+            _, _, future = heapq.heappop(self._waiters)
+            # Cancelled by a timeout or a client going away, not yet removed by its waiter
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+        concurrency_queue_length.set(len(self._waiters))
+        concurrency_in_flight.set(self.in_flight)
+
+    async def _shed(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            {"detail": "Server is overloaded, retry later"},
+            status_code=503,
+            headers={"Retry-After": str(self.retry_after)}
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,49 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.access_log import AccessLogger
+from app.core.request_id import get_request_id
+
+
+class RequestLoggingMiddleware:
+    """Pure ASGI middleware writing one access log record per HTTP request.
+
+    Only used when metrics are disabled; otherwise ``MetricsMiddleware`` hands
+    its own timings to the access logger and the request isn't timed twice.
+    """
+
+    def __init__(self, app: ASGIApp, access_logger: AccessLogger):
+        self.app = app
+        self.access_logger = access_logger
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        request_id = get_request_id(scope)
+        status_code = 500
+        response_size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_size
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            elif message['type'] == 'http.response.body':
+                response_size += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            self.access_logger.log(
+                scope,
+                endpoint=getattr(route, 'path', scope['path']),
+                status_code=status_code,
+                duration=time.perf_counter() - start_time,
+                response_size=response_size,
+                request_id=request_id
+            )
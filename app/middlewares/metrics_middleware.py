@@ -1,109 +1,189 @@
-from typing import Callable
+from typing import Optional
 import time
 
-from fastapi import Request, Response
-from starlette.types import ASGIApp
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.core.access_log import AccessLogger
+from app.core.request_id import get_request_id
 from app.metrics.http_metrics import HTTPMetrics
-
-
-class MetricsMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: ASGIApp, http_metrics: HTTPMetrics):
-        super().__init__(app)
+from app.metrics.request_timing import end_request_timing, start_request_timing
+from app.metrics.route_resolver import RouteResolver
+
+
+# Status recorded when the client went away before the response was complete
+CLIENT_CLOSED_REQUEST = 499
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording HTTP metrics by wrapping ``send``.
+
+    Response size is counted from the body messages as they go out, so
+    streaming responses are measured as well as buffered ones. When an
+    ``access_logger`` is given, the same measurements are logged for the
+    request.
+
+    With ``phase_timing`` each request gets a ``RequestTiming`` context that
+    instrumented code adds spans to; phase durations are recorded by route
+    template and, with ``server_timing``, sent in a ``Server-Timing`` header.
+
+    With ``exemplars`` the request id (the ``traceparent`` trace id, else
+    ``X-Request-ID``, else a generated one) is attached to sampled duration
+    and size observations and written to the access log. Whenever a request
+    id is taken, it is also sent back in an ``X-Request-ID`` response header
+    so clients can quote it.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            http_metrics: HTTPMetrics,
+            route_resolver: Optional[RouteResolver] = None,
+            access_logger: Optional[AccessLogger] = None,
+            phase_timing: bool = True,
+            server_timing: bool = False,
+            exemplars: bool = True
+    ):
+        self.app = app
         self.http_metrics = http_metrics
-
-    def _get_route_path(self, request: Request) -> str:
-        """Extract the route path from the request"""
-        # Try to get the matched route path
-        if hasattr(request, 'url') and hasattr(request.url, 'path'):
-            path = request.url.path
-
-            # Try to get the route from FastAPI
-            if hasattr(request, 'scope') and 'route' in request.scope:
-                route = request.scope.get('route')
-                if hasattr(route, 'path'):
-                    return route.path
-
-            # Fallback to actual path
-            return path
-
-        return "unknown"
-
-    def _get_request_size(self, request: Request) -> int:
+        self.route_resolver = route_resolver
+        self.access_logger = access_logger
+        self.phase_timing = phase_timing or server_timing
+        self.server_timing = server_timing
+        self.exemplars = exemplars
+
+    def _get_route_path(self, scope: Scope) -> str:
+        """Extract the route path from the request scope"""
+        # Map the raw path to its route template before routing has run
+        if self.route_resolver is not None:
+            return self.route_resolver.resolve(scope['path'])
+
+        # Try to get the route from FastAPI
+        route = scope.get('route')
+        if hasattr(route, 'path'):
+            return route.path
+
+        # Fallback to actual path
+        return scope.get('path') or "unknown"
+
+    def _get_request_size(self, scope: Scope) -> int:
         """Get request content length"""
-        content_length = request.headers.get('content-length')
-        if content_length:
-            try:
-                return int(content_length)
-            except ValueError:
-                pass
+        for name, value in scope.get('headers', ()):
+            if name == b'content-length':
+                try:
+                    return int(value)
+                except ValueError:
+                    return 0
         return 0
 
-    def _get_response_size(self, response: Response) -> int:
-        """Get response content length"""
-        if hasattr(response, 'headers') and 'content-length' in response.headers:
-            try:
-                return int(response.headers['content-length'])
-            except ValueError:
-                pass
-
-        # Try to get from body if available
-        if hasattr(response, 'body'):
-            return len(response.body) if response.body else 0
-
-        return 0
-
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
-
-        method = request.method
-        endpoint = self._get_route_path(request)
-        request_size = self._get_request_size(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+
+        method = scope['method']
+        endpoint = self._get_route_path(scope)
+        request_size = self._get_request_size(scope)
+        request_id = get_request_id(scope) if self.exemplars or self.access_logger is not None else None
+        trace_id = request_id if self.exemplars else None
+
+        status_code: Optional[int] = None
+        response_size = 0
+        received_size = 0
+        first_byte_time: Optional[float] = None
+        last_byte_time: Optional[float] = None
+        disconnected = False
+        timing, timing_token = start_request_timing() if self.phase_timing else (None, None)
+
+        async def receive_wrapper() -> Message:
+            nonlocal received_size, disconnected
+            message = await receive()
+            if message['type'] == 'http.request':
+                received_size += len(message.get('body', b''))
+            elif message['type'] == 'http.disconnect':
+                disconnected = True
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_size, first_byte_time, last_byte_time
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                if request_id is not None:
+                    MutableHeaders(scope=message).append('X-Request-ID', request_id)
+                if self.server_timing:
+                    # Spans recorded while the body streams are not included
+                    MutableHeaders(scope=message).append(
+                        'Server-Timing',
+                        timing.server_timing(time.perf_counter() - start_time)
+                    )
+            elif message['type'] == 'http.response.body':
+                body = message.get('body', b'')
+                if body and first_byte_time is None:
+                    first_byte_time = time.perf_counter() - start_time
+                response_size += len(body)
+                if not message.get('more_body', False):
+                    last_byte_time = time.perf_counter() - start_time
+            await send(message)
 
         # Mark request start
         self.http_metrics.start_request(method, endpoint)
 
         try:
-            response = await call_next(request)
+            await self.app(scope, receive_wrapper, send_wrapper)
 
-            # Calculate metrics
-            duration = time.time() - start_time
-            status_code = response.status_code
-            response_size = self._get_response_size(response)
+        except Exception as exc:
+            # Record exception
+            self.http_metrics.record_exception(method, endpoint, type(exc).__name__)
 
-            # Record metrics
+            # Record request with 500 status unless headers already went out
+            status_code = status_code or 500
+            duration = time.perf_counter() - start_time
             self.http_metrics.record_request(
                 method=method,
                 endpoint=endpoint,
                 status_code=status_code,
                 duration=duration,
-                request_size=request_size,
-                response_size=response_size
+                request_size=request_size or received_size,
+                response_size=response_size,
+                first_byte_time=first_byte_time,
+                trace_id=trace_id
             )
+            if self.access_logger is not None:
+                self.access_logger.log(
+                    scope, endpoint, status_code, duration,
+                    request_size or received_size, response_size, first_byte_time, request_id
+                )
 
-            return response
+            raise
 
-        except Exception as exc:
-            # Record exception
-            exception_type = type(exc).__name__
-            self.http_metrics.record_exception(method, endpoint, exception_type)
-
-            # Calculate duration even for exceptions
-            duration = time.time() - start_time
+        else:
+            # A response that never finished was cut short by the client
+            if last_byte_time is None and (disconnected or status_code is None):
+                status_code = CLIENT_CLOSED_REQUEST
 
-            # Record request with 500 status for exceptions
+            duration = time.perf_counter() - start_time
             self.http_metrics.record_request(
                 method=method,
                 endpoint=endpoint,
-                status_code=500,
+                status_code=status_code,
                 duration=duration,
-                request_size=request_size,
-                response_size=0
+                request_size=request_size or received_size,
+                response_size=response_size,
+                first_byte_time=first_byte_time,
+                last_byte_time=last_byte_time,
+                trace_id=trace_id
             )
-
-            raise exc
+            if self.access_logger is not None:
+                self.access_logger.log(
+                    scope, endpoint, status_code, duration,
+                    request_size or received_size, response_size, first_byte_time, request_id
+                )
 
         finally:
+            if timing is not None:
+                self.http_metrics.record_phases(endpoint, timing.phases)
+                end_request_timing(timing_token)
             # Mark request end
-            self.http_metrics.end_request(method, endpoint)
\ No newline at end of file
+            self.http_metrics.end_request(method, endpoint)
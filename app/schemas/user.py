@@ -1,8 +1,11 @@
 from uuid import UUID
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter
+from typing import List, Literal, Optional
+from typing_extensions import TypedDict
 from datetime import datetime
 
+from app.core.config import settings
+
 
 class UserBaseSchema(BaseModel):
     email: EmailStr
@@ -55,3 +58,36 @@ class UserResponseSchema(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class UserResponseRow(TypedDict):
+    """UserResponseSchema fields as selected from the database, serialized without validation"""
+    id: UUID
+    email: str
+    username: str
+    full_name: Optional[str]
+    bio: Optional[str]
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+
+# Built once; dump_json serializes rows straight to JSON bytes
+user_rows_adapter = TypeAdapter(List[UserResponseRow])
+
+
+class BulkUserCreateSchema(BaseModel):
+    # Each row costs a bcrypt hash, see USER_BULK_MAX_ROWS
+    users: List[NewUserSchema] = Field(..., min_length=1, max_length=settings.USER_BULK_MAX_ROWS)
+
+
+class BulkUserResultSchema(BaseModel):
+    index: int
+    status: Literal["created", "conflict"]
+    id: Optional[UUID] = None
+
+
+class BulkUserResponseSchema(BaseModel):
+    created: int
+    conflicts: int
+    results: List[BulkUserResultSchema]
@@ -0,0 +1,81 @@
+"""Bulk user import throughput in rows per second.
+
+Compares one ``UserSelector.create`` call per row against
+``UserSelector.create_many``, called in batches of ``USER_BULK_MAX_ROWS``
+as ``POST /api/v1/users/bulk`` would be. Needs the PostgreSQL database from
+``DATABASE_URL``; the rows it inserts are deleted afterwards.
+
+Passwords are hashed in the bcrypt process pool at ``--rounds``. The
+default of 4 measures the insert path; at the production cost of 12 both
+variants are bound by hashing, about PASSWORD_HASH_WORKERS / 0.25 rows per
+second, which is why bulk requests are capped.
+
+Usage:
+    python -m benchmarks.bench_bulk_import [--rows N] [--rounds 4]
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import delete
+
+from app.api.users.selectors import UserSelector
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, create_engine, dispose_engine
+from app.core.security import password_hasher
+from app.models.user import UserModel
+from app.schemas.user import NewUserSchema
+
+
+def make_users(prefix: str, rows: int):
+    return [
+        NewUserSchema(
+            email=f"{prefix}{i}@example.com",
+            username=f"{prefix}{i}",
+            full_name="Bench User",
+            password="benchmark-password",
+        )
+        for i in range(rows)
+    ]
+
+
+async def per_row(users) -> None:
+    async with AsyncSessionLocal() as db:
+        for user in users:
+            await UserSelector.create(db, user)
+
+
+async def bulk(users) -> None:
+    async with AsyncSessionLocal() as db:
+        for start in range(0, len(users), settings.USER_BULK_MAX_ROWS):
+            await UserSelector.create_many(db, users[start:start + settings.USER_BULK_MAX_ROWS])
+
+
+async def main(rows: int, rounds: int) -> None:
+    prefix = f"bench{uuid.uuid4().hex[:8]}_"
+    password_hasher.rounds = rounds
+    password_hasher.start()
+    # The application creates the engine in its lifespan
+    create_engine()
+    try:
+        for name, insert in (("per-row", per_row), ("bulk", bulk)):
+            users = make_users(f"{prefix}{name}_", rows)
+            start = time.perf_counter()
+            await insert(users)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<8} {rows / elapsed:12,.0f} rows/s")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(UserModel).where(UserModel.username.startswith(prefix)))
+            await db.commit()
+        await dispose_engine()
+        password_hasher.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=4, help="bcrypt cost for the inserted users")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.rounds))
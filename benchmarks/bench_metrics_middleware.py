@@ -0,0 +1,139 @@
+"""Per-request overhead of MetricsMiddleware.
+
+Compares the pure ASGI ``MetricsMiddleware`` against the previous
+``BaseHTTPMiddleware`` implementation and against no middleware at all,
+for a buffered JSON response and a streaming response.
+
+Usage:
+    python -m benchmarks.bench_metrics_middleware [--requests N]
+"""
+import argparse
+import asyncio
+import time
+from typing import Callable
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from prometheus_client import CollectorRegistry
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp
+
+from app.metrics.http_metrics import HTTPMetrics
+from app.middlewares.metrics_middleware import MetricsMiddleware
+
+
+class LegacyMetricsMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware implementation replaced by MetricsMiddleware"""
+
+    def __init__(self, app: ASGIApp, http_metrics: HTTPMetrics):
+        super().__init__(app)
+        self.http_metrics = http_metrics
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        start_time = time.time()
+        method = request.method
+        route = request.scope.get('route')
+        endpoint = route.path if hasattr(route, 'path') else request.url.path
+        content_length = request.headers.get('content-length')
+        request_size = int(content_length) if content_length else 0
+
+        self.http_metrics.start_request(method, endpoint)
+        try:
+            response = await call_next(request)
+            response_size = int(response.headers.get('content-length', 0))
+            self.http_metrics.record_request(
+                method=method,
+                endpoint=endpoint,
+                status_code=response.status_code,
+                duration=time.time() - start_time,
+                request_size=request_size,
+                response_size=response_size
+            )
+            return response
+        finally:
+            self.http_metrics.end_request(method, endpoint)
+
+
+def build_app(middleware=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/json")
+    async def json_endpoint():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream_endpoint():
+        async def chunks():
+            for _ in range(8):
+                yield b"x" * 1024
+        return StreamingResponse(chunks())
+
+    if middleware is not None:
+        app.add_middleware(middleware, http_metrics=HTTPMetrics(registry=CollectorRegistry()))
+    return app
+
+
+async def call(app: ASGIApp, path: str) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if request_sent:
+            # Park like a connected client until the response is done
+            await asyncio.Event().wait()
+        request_sent = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def run(app: ASGIApp, path: str, requests: int) -> float:
+    # Warm up route matching and label children
+    for _ in range(100):
+        await call(app, path)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path)
+    return (time.perf_counter() - start) / requests
+
+
+async def main(requests: int) -> None:
+    variants = {
+        "none": build_app(),
+        "legacy": build_app(LegacyMetricsMiddleware),
+        "asgi": build_app(MetricsMiddleware),
+    }
+    for path in ("/json", "/stream"):
+        baseline = await run(variants["none"], path, requests)
+        for name, app in variants.items():
+            per_request = await run(app, path, requests)
+            print(
+                f"{path:<8} {name:<7} {per_request * 1e6:8.1f} us/req  "
+                f"overhead {(per_request - baseline) * 1e6:7.1f} us"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
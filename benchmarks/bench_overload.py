@@ -0,0 +1,125 @@
+"""Goodput under overload with and without the adaptive concurrency limit.
+
+Serves an endpoint backed by a simulated connection pool: ``--pool-size``
+connections, each query holding one for ``--service-time`` seconds, and a
+``--pool-timeout`` after which waiting requests fail with 500 as they do
+when SQLAlchemy's pool is exhausted. Closed-loop clients give up on
+requests slower than ``--deadline`` and immediately send a new one, while
+the abandoned request keeps its place in the pool queue, which is how the
+queue snowballs in production. Shed requests (503) are retried after
+``--retry-delay``.
+
+Goodput is the rate of 200 responses that arrived within the deadline.
+Each client count is run without the limiter and with it.
+
+Usage:
+    python -m benchmarks.bench_overload [--clients 10 50 200 500] [--duration 5]
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import Dict
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from benchmarks.suite import ASGIClient
+from app.middlewares.concurrency_limit_middleware import ConcurrencyLimitMiddleware, GradientLimit
+
+
+class PoolBackedApp:
+    """ASGI app whose requests each run one query on a small connection pool"""
+
+    def __init__(self, pool_size: int, service_time: float, pool_timeout: float):
+        self.pool = asyncio.Semaphore(pool_size)
+        self.service_time = service_time
+        self.pool_timeout = pool_timeout
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await asyncio.wait_for(self.pool.acquire(), self.pool_timeout)
+        except asyncio.TimeoutError:
+            status = 500
+        else:
+            try:
+                await asyncio.sleep(self.service_time)
+            finally:
+                self.pool.release()
+            status = 200
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+
+async def client(app: ASGIApp, deadline: float, retry_delay: float, stop_at: float, outcomes: Counter) -> None:
+    http = ASGIClient(app)
+    while time.monotonic() < stop_at:
+        start = time.monotonic()
+        # Shielded: the server goes on working after the client gives up
+        request = asyncio.ensure_future(http.request("/api/v1/users/"))
+        try:
+            status, _ = await asyncio.wait_for(asyncio.shield(request), deadline)
+        except asyncio.TimeoutError:
+            outcomes["timeout"] += 1
+            continue
+        if status == 200:
+            outcomes["ok"] += 1
+            outcomes["ok_latency"] += time.monotonic() - start
+        elif status == 503:
+            outcomes["shed"] += 1
+            await asyncio.sleep(retry_delay)
+        else:
+            outcomes["error"] += 1
+
+
+async def run(clients: int, limited: bool, args: argparse.Namespace) -> Dict[str, float]:
+    app: ASGIApp = PoolBackedApp(args.pool_size, args.service_time, args.pool_timeout)
+    limiter = None
+    if limited:
+        limiter = ConcurrencyLimitMiddleware(app, limit=GradientLimit(initial_limit=args.initial_limit))
+        app = limiter
+
+    outcomes: Counter = Counter()
+    stop_at = time.monotonic() + args.duration
+    await asyncio.gather(*(
+        client(app, args.deadline, args.retry_delay, stop_at, outcomes) for _ in range(clients)
+    ))
+    # Let abandoned requests drain before the next run
+    while asyncio.all_tasks() - {asyncio.current_task()}:
+        await asyncio.sleep(0.05)
+
+    ok = outcomes["ok"]
+    return {
+        "goodput": ok / args.duration,
+        "mean_ms": outcomes["ok_latency"] / ok * 1e3 if ok else 0.0,
+        "timeout": outcomes["timeout"],
+        "error": outcomes["error"],
+        "shed": outcomes["shed"],
+        "limit": limiter.limit.limit if limiter else float("nan"),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    capacity = args.pool_size / args.service_time
+    print(f"capacity {capacity:.0f} req/s ({args.pool_size} connections x {args.service_time * 1e3:.0f} ms)")
+    print(f"{'clients':>7} {'limiter':>8} {'goodput/s':>10} {'mean ms':>8} {'timeout':>8} {'error':>6} {'shed':>7} {'limit':>6}")
+    for clients in args.clients:
+        for limited in (False, True):
+            result = await run(clients, limited, args)
+            print(
+                f"{clients:>7} {'on' if limited else 'off':>8} {result['goodput']:>10.0f} "
+                f"{result['mean_ms']:>8.1f} {result['timeout']:>8} {result['error']:>6} "
+                f"{result['shed']:>7} {result['limit']:>6.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 50, 200, 500])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--service-time", type=float, default=0.005)
+    parser.add_argument("--pool-timeout", type=float, default=1.0)
+    parser.add_argument("--deadline", type=float, default=0.25)
+    parser.add_argument("--retry-delay", type=float, default=0.05)
+    parser.add_argument("--initial-limit", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
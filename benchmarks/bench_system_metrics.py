@@ -0,0 +1,40 @@
+"""Collection cost of SystemMetrics against its budget.
+
+Usage:
+    python -m benchmarks.bench_system_metrics [--iterations N] [--budget SECONDS]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from prometheus_client import CollectorRegistry
+
+from app.metrics.system_metrics import SystemMetrics
+
+
+def main(iterations: int, budget: float) -> int:
+    collector = SystemMetrics(registry=CollectorRegistry(), collect_budget=budget)
+    if not collector.available:
+        print("/proc is not available on this platform")
+        return 0
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        list(collector.collect())
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    p50 = statistics.median(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"p50 {p50 * 1e6:8.1f} us  p99 {p99 * 1e6:8.1f} us  budget {budget * 1e6:8.1f} us")
+    return 0 if p99 <= budget else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--budget", type=float, default=0.005)
+    args = parser.parse_args()
+    sys.exit(main(args.iterations, args.budget))
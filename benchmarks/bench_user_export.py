@@ -0,0 +1,83 @@
+"""Memory use of the streaming user export.
+
+Seeds a SQLite database (through aiosqlite) with increasing row counts and
+streams the export through ``UserSelector.stream_users`` and the encoders,
+reporting the peak traced memory. Peak memory should stay flat as the
+table grows.
+
+Usage:
+    python -m benchmarks.bench_user_export [--rows 10000,100000] [--format ndjson]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.users.export import EXPORT_FORMATS
+from app.api.users.selectors import UserSelector
+from app.core.database import Base
+from app.models.user import UserModel
+
+
+async def seed(engine, rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        for start in range(0, rows, 5000):
+            await conn.execute(insert(UserModel), [
+                {
+                    "id": uuid.uuid4(),
+                    "email": f"user{i}@example.com",
+                    "username": f"user{i}",
+                    "full_name": "Export User",
+                    "bio": "x" * 100,
+                    "hashed_password": "x",
+                    "is_active": True,
+                    "is_superuser": False,
+                }
+                for i in range(start, min(start + 5000, rows))
+            ])
+
+
+async def export(engine, encode, batch_size: int) -> int:
+    sessionmaker = async_sessionmaker(engine)
+    size = 0
+    async with sessionmaker() as db:
+        async for chunk in encode(UserSelector.stream_users(db, batch_size=batch_size)):
+            size += len(chunk)
+    return size
+
+
+async def main(row_counts, export_format: str, batch_size: int) -> None:
+    _, encode = EXPORT_FORMATS[export_format]
+    for rows in row_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'users.db')}")
+            await seed(engine, rows)
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            size = await export(engine, encode, batch_size)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            await engine.dispose()
+
+        print(
+            f"{rows:>10,} rows  {size / 1e6:8.1f} MB out  "
+            f"{rows / elapsed:10,.0f} rows/s  peak {peak / 1e6:6.2f} MB"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="10000,100000")
+    parser.add_argument("--format", default="ndjson", choices=sorted(EXPORT_FORMATS))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main([int(rows) for rows in args.rows.split(",")], args.format, args.batch_size))
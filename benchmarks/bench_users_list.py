@@ -0,0 +1,97 @@
+"""CPU cost of serving a page of the users list.
+
+Seeds a SQLite database (through aiosqlite) and compares the per-request
+CPU time of the ORM path (load ``UserModel`` objects, validate them into
+``UserResponseSchema`` and JSON-encode the result, as FastAPI does for a
+``response_model``) with the Core path used by ``GET /api/v1/users/``
+(select the response columns and serialize them with the precompiled
+``user_rows_adapter``).
+
+Usage:
+    python -m benchmarks.bench_users_list [--rows 1000] [--limit 1000] [--requests 200]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.users.selectors import UserSelector
+from app.core.config import settings
+from app.core.database import Base
+from app.models.user import UserModel
+from app.schemas.user import UserResponseSchema, user_rows_adapter
+
+response_adapter = TypeAdapter(List[UserResponseSchema])
+
+
+async def seed(engine, rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(UserModel), [
+            {
+                "id": uuid.uuid4(),
+                "email": f"user{i}@example.com",
+                "username": f"user{i}",
+                "full_name": "List User",
+                "bio": "x" * 100,
+                "hashed_password": "x",
+                "is_active": True,
+                "is_superuser": False,
+            }
+            for i in range(rows)
+        ])
+
+
+async def orm_page(db, limit: int) -> bytes:
+    users = await UserSelector.get_users(db, limit=limit)
+    validated = response_adapter.validate_python(users, from_attributes=True)
+    return json.dumps(response_adapter.dump_python(validated, mode="json")).encode()
+
+
+async def core_page(db, limit: int) -> bytes:
+    return user_rows_adapter.dump_json(await UserSelector.get_user_rows(db, limit=limit))
+
+
+async def run(sessionmaker, render, limit: int, requests: int) -> float:
+    start = time.process_time()
+    for _ in range(requests):
+        async with sessionmaker() as db:
+            await render(db, limit)
+    return (time.process_time() - start) / requests
+
+
+async def main(rows: int, limit: int, requests: int) -> None:
+    # Every request must reach the database, not a coalesced or cached result
+    settings.USER_CACHE_ENABLED = False
+    settings.USER_READ_COALESCING_ENABLED = False
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'users.db')}")
+        await seed(engine, rows)
+        sessionmaker = async_sessionmaker(engine)
+
+        results = {}
+        for name, render in (("orm", orm_page), ("core", core_page)):
+            await run(sessionmaker, render, limit, 5)
+            results[name] = await run(sessionmaker, render, limit, requests)
+        await engine.dispose()
+
+    for name, cpu in results.items():
+        print(f"{name:>6}  {cpu * 1e3:8.2f} ms CPU/request  ({limit} users)")
+    print(f"speedup {results['orm'] / results['core']:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.limit, args.requests))
@@ -0,0 +1,414 @@
+"""In-process benchmark suite for routing, middleware, metrics and user endpoints.
+
+Drives ASGI apps directly (no sockets, no server) and reports throughput,
+p50 and p99 per case:
+
+    routing     route matching on the full route table, no middleware
+    middleware  /health behind each middleware layer alone, and the full
+                stack built by ``get_application()``
+    metrics     ``HTTPMetrics.record_request``, without and with exemplars
+    exposition  /metrics rendering at 100, 1k and 10k series
+    users       the user endpoints, with ``get_db`` swapped for a local
+                database (in-memory SQLite through aiosqlite by default)
+
+The read cache and single-flight window are disabled unless --with-caches
+is given, so the users cases measure the query and serialization path.
+Results can be written as JSON with --json and compared against an earlier
+run with --compare.
+
+Usage:
+    python -m benchmarks.suite [--only routing,users] [--requests 2000]
+        [--database-url sqlite+aiosqlite://] [--json out.json] [--compare base.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CollectorRegistry, Counter
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from starlette.types import ASGIApp
+
+from app.api.routers import api_router
+from app.api.users.cache import user_reads
+from app.core.access_log import access_logger
+from app.core.config import settings
+from app.core.database import Base, get_db
+from app.core.main import get_application
+from app.metrics.base import metrics_router
+from app.metrics.exposition import MetricsExposition
+from app.metrics.http_metrics import HTTPMetrics
+from app.metrics.route_resolver import RouteResolver
+from app.middlewares.compression_middleware import CompressionMiddleware
+from app.middlewares.concurrency_limit_middleware import ConcurrencyLimitMiddleware, GradientLimit
+from app.middlewares.logging_middleware import RequestLoggingMiddleware
+from app.middlewares.metrics_middleware import MetricsMiddleware
+from app.models.user import UserModel
+
+GROUPS = ("routing", "middleware", "metrics", "exposition", "users")
+
+Operation = Callable[[], Union[None, Awaitable[None]]]
+
+
+class ASGIClient:
+    """Calls an ASGI app in-process"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def request(
+            self,
+            path: str,
+            query: str = "",
+            headers: Optional[Dict[str, str]] = None,
+            method: str = "GET"
+    ) -> Tuple[int, Dict[str, str]]:
+        """Return the response status and headers"""
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"bench")] + [
+                (name.lower().encode(), value.encode()) for name, value in (headers or {}).items()
+            ],
+            "client": ("127.0.0.1", 1234),
+            "server": ("bench", 80),
+        }
+        request_sent = False
+        status = 0
+        response_headers: Dict[str, str] = {}
+
+        async def receive():
+            nonlocal request_sent
+            if request_sent:
+                # Park like a connected client until the response is done
+                await asyncio.Event().wait()
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers.update((k.decode(), v.decode()) for k, v in message["headers"])
+
+        await self.app(scope, receive, send)
+        return status, response_headers
+
+    def get(self, path: str, expect: int = 200, **kwargs) -> Callable[[], Awaitable[None]]:
+        """Operation issuing one request and checking its status"""
+        async def operation():
+            status, _ = await self.request(path, **kwargs)
+            if status != expect:
+                raise RuntimeError(f"GET {path} returned {status}, expected {expect}")
+        return operation
+
+
+async def measure(name: str, operation: Operation, iterations: int) -> Dict[str, Any]:
+    """Time ``iterations`` calls after a warm-up and summarize the latencies"""
+    is_async = asyncio.iscoroutinefunction(operation)
+    for _ in range(min(iterations // 10 + 1, 100)):
+        if is_async:
+            await operation()
+        else:
+            operation()
+
+    samples = []
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        t0 = time.perf_counter_ns()
+        if is_async:
+            await operation()
+        else:
+            operation()
+        samples.append(time.perf_counter_ns() - t0)
+    elapsed = (time.perf_counter_ns() - start) / 1e9
+
+    samples.sort()
+    return {
+        "name": name,
+        "iterations": iterations,
+        "ops_per_sec": iterations / elapsed,
+        "p50_us": samples[len(samples) // 2] / 1e3,
+        "p99_us": samples[min(int(len(samples) * 0.99), len(samples) - 1)] / 1e3,
+    }
+
+
+def health_app(*layers: Tuple[type, Dict[str, Any]]) -> FastAPI:
+    """App with only /health, behind the given middleware layers"""
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy", "version": "1.0.0"}
+
+    for middleware, options in layers:
+        app.add_middleware(middleware, **options)
+    return app
+
+
+async def bench_routing(context: Dict[str, Any], requests: int) -> List[Dict[str, Any]]:
+    app = FastAPI()
+    app.include_router(api_router, prefix="/api")
+    app.include_router(metrics_router)
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy", "version": "1.0.0"}
+
+    client = ASGIClient(app)
+    return [
+        await measure("routing.static", client.get("/health"), requests),
+        await measure("routing.not_found", client.get("/api/v1/missing/path", expect=404), requests),
+    ]
+
+
+async def bench_middleware(context: Dict[str, Any], requests: int) -> List[Dict[str, Any]]:
+    cors = (CORSMiddleware, {
+        "allow_origins": settings.ALLOWED_CORS_ORIGINS,
+        "allow_credentials": True,
+        "allow_methods": ["*"],
+        "allow_headers": ["*"],
+    })
+    bare = health_app()
+    with_metrics = health_app()
+    with_metrics.add_middleware(
+        MetricsMiddleware,
+        http_metrics=HTTPMetrics(registry=CollectorRegistry()),
+        route_resolver=RouteResolver(with_metrics.router)
+    )
+
+    variants = [
+        ("middleware.none", bare),
+        ("middleware.cors", health_app(cors)),
+        ("middleware.logging", health_app((RequestLoggingMiddleware, {"access_logger": access_logger}))),
+        ("middleware.compression", health_app((CompressionMiddleware, {}))),
+        ("middleware.concurrency_limit", health_app((ConcurrencyLimitMiddleware, {"limit": GradientLimit()}))),
+        ("middleware.metrics", with_metrics),
+        ("middleware.full", context["app"]),
+    ]
+    return [await measure(name, ASGIClient(app).get("/health"), requests) for name, app in variants]
+
+
+async def bench_metrics(context: Dict[str, Any], requests: int) -> List[Dict[str, Any]]:
+    endpoints = ["/api/v1/users/", "/api/v1/users/{user_id}", "/health", "/metrics"]
+    results = []
+    variants = (
+        ("metrics.record_request", None),
+        ("metrics.record_request_exemplars", "4bf92f3577b34da6a3ce929d0e0e4736"),
+    )
+    for name, trace_id in variants:
+        http_metrics = HTTPMetrics(registry=CollectorRegistry())
+        calls = 0
+
+        def record():
+            nonlocal calls
+            calls += 1
+            http_metrics.record_request(
+                method="GET",
+                endpoint=endpoints[calls % len(endpoints)],
+                status_code=200,
+                duration=0.012,
+                response_size=512,
+                first_byte_time=0.011,
+                last_byte_time=0.012,
+                trace_id=trace_id
+            )
+
+        results.append(await measure(name, record, requests * 10))
+    return results
+
+
+async def bench_exposition(context: Dict[str, Any], requests: int) -> List[Dict[str, Any]]:
+    results = []
+    for series in (100, 1000, 10000):
+        registry = CollectorRegistry()
+        counter = Counter("bench_series", "Benchmark series", ["series"], registry=registry)
+        for i in range(series):
+            counter.labels(series=str(i)).inc()
+
+        # ttl=0 so every call renders instead of hitting the cache
+        exposition = MetricsExposition(ttl=0, registry=registry)
+        iterations = max(requests // (series // 100), 20)
+        for encoding in ("identity", "gzip"):
+            async def render(encoding=encoding):
+                await exposition.render(accept_encoding=encoding)
+            results.append(await measure(f"exposition.{series}.{encoding}", render, iterations))
+    return results
+
+
+async def bench_users(context: Dict[str, Any], requests: int) -> List[Dict[str, Any]]:
+    client = ASGIClient(context["app"])
+    user_id = context["user_ids"][0]
+
+    status, headers = await client.request("/api/v1/users/", query="limit=100")
+    if status != 200:
+        raise RuntimeError(f"GET /api/v1/users/ returned {status}")
+    etag = headers["etag"]
+
+    return [
+        await measure("users.list", client.get("/api/v1/users/", query="limit=100"), requests),
+        await measure(
+            "users.list_gzip",
+            client.get("/api/v1/users/", query="limit=100", headers={"Accept-Encoding": "gzip"}),
+            requests
+        ),
+        await measure(
+            "users.list_not_modified",
+            client.get("/api/v1/users/", expect=304, query="limit=100", headers={"If-None-Match": etag}),
+            requests
+        ),
+        await measure("users.get", client.get(f"/api/v1/users/{user_id}"), requests),
+        await measure("users.get_missing", client.get(f"/api/v1/users/{uuid.uuid4()}", expect=404), requests),
+    ]
+
+
+async def use_database(app: FastAPI, database_url: str, users: int) -> Tuple[Any, List[uuid.UUID]]:
+    """Point ``get_db`` at ``database_url`` and seed it with users"""
+    options = {"poolclass": StaticPool} if database_url.rstrip("/").endswith(("://", ":memory:")) else {}
+    engine = create_async_engine(database_url, **options)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_bench_db():
+        async with sessionmaker() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_bench_db
+
+    ids = [uuid.uuid4() for _ in range(users)]
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(UserModel), [
+            {
+                "id": user_id,
+                "email": f"bench{i}@example.com",
+                "username": f"bench{i}",
+                "full_name": "Bench User",
+                "bio": "x" * 100,
+                "hashed_password": "x",
+                "is_active": True,
+                "is_superuser": False,
+            }
+            for i, user_id in enumerate(ids)
+        ])
+    return engine, ids
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def report(results: List[Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]]) -> None:
+    header = f"{'case':<34} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10}"
+    print(header + ("   p50 vs base" if baseline else ""))
+    for result in results:
+        line = (
+            f"{result['name']:<34} {result['ops_per_sec']:12,.0f} "
+            f"{result['p50_us']:10.1f} {result['p99_us']:10.1f}"
+        )
+        previous = (baseline or {}).get(result["name"])
+        if previous:
+            line += f"   {(result['p50_us'] / previous['p50_us'] - 1) * 100:+7.1f}%"
+        print(line)
+
+
+async def main(args: argparse.Namespace) -> None:
+    groups = args.only.split(",") if args.only else list(GROUPS)
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        raise SystemExit(f"Unknown groups: {', '.join(sorted(unknown))}")
+
+    # Keep logging's formatting cost without writing to the terminal
+    devnull = open(os.devnull, "w")
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(devnull)
+    access_logger.start(stream=devnull)
+
+    if not args.with_caches:
+        settings.USER_CACHE_ENABLED = False
+        settings.USER_READ_COALESCING_ENABLED = False
+        user_reads.window = 0
+
+    context: Dict[str, Any] = {"app": get_application()}
+    # The lifespan isn't run, so mark the app ready as pool warm-up would
+    context["app"].state.ready = True
+    engine = None
+    if "users" in groups:
+        engine, context["user_ids"] = await use_database(context["app"], args.database_url, args.users)
+
+    benches = {
+        "routing": bench_routing,
+        "middleware": bench_middleware,
+        "metrics": bench_metrics,
+        "exposition": bench_exposition,
+        "users": bench_users,
+    }
+    results = []
+    try:
+        for group in groups:
+            results.extend(await benches[group](context, args.requests))
+    finally:
+        access_logger.stop()
+        if engine is not None:
+            await engine.dispose()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {result["name"]: result for result in json.load(f)["results"]}
+    report(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "environment": environment(),
+                "options": {
+                    "requests": args.requests,
+                    "users": args.users,
+                    "database_url": args.database_url,
+                    "with_caches": args.with_caches,
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"Results written to {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", help=f"Comma-separated groups out of {', '.join(GROUPS)}")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=1000, help="Users seeded for the users group")
+    parser.add_argument("--database-url", default="sqlite+aiosqlite://")
+    parser.add_argument("--with-caches", action="store_true")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Earlier --json output to compare p50 against")
+    asyncio.run(main(parser.parse_args()))
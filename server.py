@@ -1,5 +1,6 @@
 import uvicorn
 from app.core.config import settings
+from app.metrics.multiprocess import prepare_multiprocess_dir
 
 
 
@@ -7,10 +8,12 @@ from app.core.config import settings
 if __name__ == "__main__":
     """Entrypoint of the application."""
     print(settings.HOST)
-    print(settings.DATABASE_URL)
     print(settings.ENVIRONMENT)
+    if settings.WORKERS_COUNT > 1:
+        # Workers share metrics through per-PID files merged on /metrics
+        prepare_multiprocess_dir(settings.metrics_multiproc_dir)
     uvicorn.run(
-        "app.core.main:get_application",
+        "app.core.startup:create_application",
         workers=settings.WORKERS_COUNT,
         host=settings.HOST,
         port=settings.PORT,
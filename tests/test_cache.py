@@ -0,0 +1,153 @@
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from app.core import cache
+from app.core.cache import ReadThroughCache, SharedCacheTier
+
+
+class FakeRedis:
+    """In-memory stand-in for the async Redis client, with expiry on ``now``"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.data: Dict[str, Tuple[float, bytes]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None or entry[0] <= self.now:
+            self.data.pop(key, None)
+            return None
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, ex: int) -> None:
+        self.data[key] = (self.now + ex, value)
+
+    async def delete(self, key: str) -> None:
+        self.data.pop(key, None)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cache(redis: FakeRedis, **kwargs) -> ReadThroughCache[str]:
+    return ReadThroughCache(
+        "test",
+        serialize=str.encode,
+        deserialize=bytes.decode,
+        ttl=60.0,
+        negative_ttl=5.0,
+        shared=SharedCacheTier(redis, prefix="test:"),
+        **kwargs
+    )
+
+
+class Loader:
+    def __init__(self, value: Optional[str]):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self) -> Optional[str]:
+        self.calls += 1
+        return self.value
+
+
+def test_miss_loads_once_then_hits_both_tiers():
+    async def scenario():
+        redis = FakeRedis()
+        loader = Loader("alice")
+        first = make_cache(redis)
+        assert await first.get_or_load("1", loader) == "alice"
+        assert await first.get_or_load("1", loader) == "alice"
+        assert loader.calls == 1
+        assert redis.data["test:1"][1] == b"alice"
+
+        # Another worker finds it in the shared tier
+        assert await make_cache(redis).get_or_load("1", loader) == "alice"
+        assert loader.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_missing_value_is_cached_for_the_negative_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+
+    async def scenario():
+        redis = FakeRedis()
+        loader = Loader(None)
+        users = make_cache(redis)
+        assert await users.get_or_load("1", loader) is None
+        assert await users.get_or_load("1", loader) is None
+        assert loader.calls == 1
+        assert redis.data["test:1"] == (5, b"")
+
+        clock.now = redis.now = 5.0
+        assert await users.get_or_load("1", loader) is None
+        assert loader.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+
+    async def scenario():
+        redis = FakeRedis()
+        loader = Loader("alice")
+        users = make_cache(redis)
+        await users.get_or_load("1", loader)
+
+        clock.now = redis.now = 59.0
+        await users.get_or_load("1", loader)
+        assert loader.calls == 1
+
+        clock.now = redis.now = 60.0
+        await users.get_or_load("1", loader)
+        assert loader.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_clears_both_tiers():
+    async def scenario():
+        redis = FakeRedis()
+        loader = Loader("alice")
+        users = make_cache(redis)
+        await users.get_or_load("1", loader)
+
+        await users.invalidate("1")
+        assert "test:1" not in redis.data
+        loader.value = "bob"
+        assert await users.get_or_load("1", loader) == "bob"
+        assert loader.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_other_workers_see_a_write_after_the_local_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+
+    async def scenario():
+        redis = FakeRedis()
+        loader = Loader(None)
+        writer = make_cache(redis, local_ttl=2.0)
+        reader = make_cache(redis, local_ttl=2.0)
+        assert await reader.get_or_load("1", loader) is None
+
+        # The user is created on the writer; the reader's cached miss is only local to it
+        await writer.invalidate("1")
+        loader.value = "alice"
+        clock.now = 1.0
+        assert await reader.get_or_load("1", loader) is None
+
+        clock.now = 2.0
+        assert await reader.get_or_load("1", loader) == "alice"
+
+    asyncio.run(scenario())
@@ -0,0 +1,85 @@
+import asyncio
+
+from app.middlewares.concurrency_limit_middleware import ConcurrencyLimitMiddleware, GradientLimit
+
+
+def make_limiter(queue_timeout: float = 1.0):
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    limiter = ConcurrencyLimitMiddleware(
+        app, GradientLimit(initial_limit=1, min_limit=1), queue_timeout=queue_timeout
+    )
+    return limiter, release
+
+
+async def call(limiter, path="/api/v1/users/"):
+    statuses = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    await limiter({"type": "http", "method": "GET", "path": path, "headers": []}, receive, send)
+    return statuses[0]
+
+
+def test_cancelled_waiter_released_in_the_same_turn_loses_no_permit():
+    async def scenario():
+        limiter, release = make_limiter()
+        holder = asyncio.create_task(call(limiter))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(call(limiter))
+        await asyncio.sleep(0)
+        assert len(limiter._waiters) == 1
+
+        # The waiter's future is cancelled before it can remove itself
+        waiter.cancel()
+        release.set()
+        assert await holder == 200
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        assert limiter.in_flight == 0
+        assert limiter._waiters == []
+        assert await call(limiter) == 200
+
+    asyncio.run(scenario())
+
+
+def test_timed_out_waiter_released_in_the_same_turn_loses_no_permit():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        for _ in range(20):
+            limiter, release = make_limiter(queue_timeout=0.01)
+            release.set()
+            # The permit held by a finishing request comes back just before the waiter's deadline
+            limiter.in_flight = 1
+            loop.call_at(loop.time() + limiter.queue_timeout - 1e-6, limiter._release)
+            status = await call(limiter)
+
+            # Served with the permit it was handed, or shed without holding one
+            assert status in (200, 503)
+            assert limiter.in_flight == 0
+            assert limiter._waiters == []
+
+    asyncio.run(scenario())
+
+
+def test_exempt_paths_take_no_permit():
+    async def scenario():
+        limiter, release = make_limiter()
+        limiter.exempt_paths = frozenset({"/api/v1/users/export"})
+        export = asyncio.create_task(call(limiter, "/api/v1/users/export"))
+        await asyncio.sleep(0)
+        assert limiter.in_flight == 0
+        release.set()
+        assert await export == 200
+
+    asyncio.run(scenario())
@@ -0,0 +1,39 @@
+import os
+
+from prometheus_client import generate_latest
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.metrics import multiprocess
+from app.metrics.latency_sketch import DDSketch, LatencySketches
+
+
+def test_quantiles_within_relative_accuracy():
+    sketch = DDSketch(relative_accuracy=0.01)
+    for value in range(1, 10001):
+        sketch.add(value / 1000)
+
+    for q, value in zip((0.5, 0.99, 0.999), sketch.quantiles([0.5, 0.99, 0.999])):
+        expected = q * 9999 / 1000 + 0.001
+        assert abs(value - expected) <= 0.01 * expected + 0.001
+
+
+def test_sketches_rendered_in_multiprocess_mode(tmp_path, monkeypatch):
+    monkeypatch.setenv(multiprocess.MULTIPROC_DIR_ENV, str(tmp_path))
+    monkeypatch.setattr(multiprocess, '_worker_collectors', [])
+    sketches = LatencySketches(
+        'http_request_duration_sketch_seconds', 'HTTP request duration quantiles', pid_label=True
+    )
+    multiprocess.register_worker_collector(sketches)
+    sketches.sketch('GET', '/health').observe(0.05)
+
+    body = generate_latest(multiprocess.get_exposition_registry()).decode()
+    samples = [
+        sample for family in text_string_to_metric_families(body)
+        if family.name == 'http_request_duration_sketch_seconds'
+        for sample in family.samples
+    ]
+
+    quantiles = {sample.labels['quantile']: sample.value for sample in samples if 'quantile' in sample.labels}
+    assert set(quantiles) == {'0.5', '0.9', '0.99', '0.999'}
+    assert abs(quantiles['0.99'] - 0.05) <= 0.01 * 0.05
+    assert all(sample.labels['pid'] == str(os.getpid()) for sample in samples)